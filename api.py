@@ -0,0 +1,168 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import jsonify, request, current_app, make_response
+from flask_login import current_user
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import User, Task
+from stats import dashboard_stats, analytics_stats, estimated_task_count, user_scope, tasks_query
+from search import search_tasks
+from pagination import keyset_paginate
+from query_budget import query_budget
+from versions import cache_versions
+from stats_cache import cached, cache_stats
+from db_routing import read_replica
+
+API_PREFIX = '/api/v1'
+TASK_FIELDS = ('id', 'title', 'description', 'priority', 'status', 'due_date', 'assigned_to', 'assignee', 'created_by', 'created_at', 'updated_at')
+DEFAULT_TASK_FIELDS = ('id', 'title', 'priority', 'status', 'due_date', 'assignee')
+
+def api_error(message, status, **extra):
+    return jsonify(error=message, **extra), status
+
+def api_login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return api_error('Authentication required.', 401)
+        return f(*args, **kwargs)
+    return decorated_function
+
+def _utc(value):
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value else None
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    return bool(last_modified and request.if_modified_since and last_modified <= request.if_modified_since)
+
+def conditional(clock=False):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            (tasks_version, tasks_changed), (users_version, users_changed) = cache_versions('tasks', 'users')
+            if tasks_changed is None:
+                tasks_changed = db.session.query(func.max(Task.updated_at)).scalar()
+            parts = [request.endpoint, sorted(kwargs.items()), sorted(request.args.items(multi=True)),
+                     current_user.id, current_user.role, tasks_version, users_version]
+            if clock:
+                parts.append(datetime.utcnow().strftime('%Y-%m-%dT%H:%M'))
+            etag = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:20]
+            last_modified = None if clock else _utc(max(filter(None, (tasks_changed, users_changed)), default=None))
+
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+def requested_fields():
+    fields = request.args.get('fields', '', type=str)
+    if not fields:
+        return DEFAULT_TASK_FIELDS, None
+    fields = tuple(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in TASK_FIELDS]
+    return fields, unknown
+
+def task_columns(fields):
+    assignee = aliased(User)
+    columns = [getattr(Task, field).label(field) for field in fields if field != 'assignee']
+    if 'assignee' in fields:
+        columns.append(assignee.username.label('assignee'))
+    for field in ('id', 'created_at'):
+        if field not in fields:
+            columns.append(getattr(Task, field).label(field))
+    return columns, assignee if 'assignee' in fields else None
+
+def serialize(row, fields):
+    values = {}
+    for field in fields:
+        value = getattr(row, field)
+        values[field] = value.isoformat() if isinstance(value, datetime) else value
+    return values
+
+def register_api(app):
+    @app.route(f'{API_PREFIX}/tasks')
+    @api_login_required
+    @read_replica
+    @query_budget(6)
+    @conditional()
+    def api_tasks():
+        fields, unknown = requested_fields()
+        if unknown:
+            return api_error('Unknown fields.', 400, fields=unknown)
+        search = request.args.get('search', '', type=str)
+        status_filter = request.args.get('status', '', type=str)
+        priority_filter = request.args.get('priority', '', type=str)
+        cursor = request.args.get('cursor', '', type=str)
+        limit = max(1, min(request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int), current_app.config['API_MAX_PAGE_SIZE']))
+
+        columns, assignee = task_columns(fields)
+        filters = {'status': status_filter, 'priority': priority_filter}
+        if search:
+            query = search_tasks(user_scope(current_user), search, filters).with_entities(*columns).order_by(None)
+            total = None
+        else:
+            query = tasks_query(current_user, status_filter, priority_filter).with_entities(*columns)
+            total = estimated_task_count(current_user, status_filter, priority_filter)
+        if assignee is not None:
+            query = query.outerjoin(assignee, assignee.id == Task.assigned_to)
+
+        page = keyset_paginate(query, cursor, per_page=limit, total=total)
+        return jsonify(tasks=[serialize(row, fields) for row in page.items], next_cursor=page.next_cursor, total=page.total)
+
+    @app.route(f'{API_PREFIX}/tasks/<int:task_id>')
+    @api_login_required
+    @read_replica
+    @query_budget(4)
+    @conditional()
+    def api_task(task_id):
+        fields, unknown = requested_fields()
+        if unknown:
+            return api_error('Unknown fields.', 400, fields=unknown)
+        columns, assignee = task_columns(fields)
+        query = db.session.query(*columns).filter(Task.id == task_id)
+        scope = user_scope(current_user)
+        if scope is not None:
+            query = query.filter(scope)
+        if assignee is not None:
+            query = query.outerjoin(assignee, assignee.id == Task.assigned_to)
+        row = query.first()
+        if row is None:
+            return api_error('Task not found.', 404)
+        return jsonify(serialize(row, fields))
+
+    @app.route(f'{API_PREFIX}/stats')
+    @api_login_required
+    @read_replica
+    @query_budget(8)
+    @conditional(clock=True)
+    def api_stats():
+        return jsonify(dashboard_stats(current_user))
+
+    @app.route(f'{API_PREFIX}/analytics')
+    @api_login_required
+    @read_replica
+    @query_budget(9)
+    @conditional(clock=True)
+    def api_analytics():
+        if not current_user.is_manager():
+            return api_error('Manager or admin privileges required.', 403)
+        return jsonify(cached('analytics:stats', analytics_stats))
+
+    @app.route(f'{API_PREFIX}/cache-stats')
+    @api_login_required
+    def api_cache_stats():
+        if not current_user.is_admin():
+            return api_error('Admin privileges required.', 403)
+        return jsonify(cache_stats())
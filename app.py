@@ -1,31 +1,66 @@
 from flask import Flask
 from config import Config
 from extensions import db, bcrypt, mail, login_manager, csrf
-from models import User
 import os
 
 app = Flask(__name__)
 app.config.from_object(Config)
+app.logger.setLevel(app.config['LOG_LEVEL'])
 
+from db_routing import configure_engines, init_db_routing
+configure_engines(app)
 db.init_app(app)
+init_db_routing(app)
 bcrypt.init_app(app)
 mail.init_app(app)
 csrf.init_app(app)
 login_manager.init_app(app)
 
+from query_budget import init_query_budget
+init_query_budget(app)
+
+from counters import init_counters
+init_counters(app)
+
+from metrics import init_metrics
+init_metrics(app)
+
+from principal import init_principal_cache, load_principal
+init_principal_cache(app)
+
+from passwords import init_password_hasher
+init_password_hasher(app)
+
+from events import init_events
+init_events(app)
+
+from stats_cache import init_stats_cache
+init_stats_cache(app)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return load_principal(int(user_id))
 
 from routes import register_routes
 register_routes(app)
 
+from api import register_api
+register_api(app)
+
+from commands import register_commands
+register_commands(app)
+
+if app.config['SCHEDULER_AUTOSTART'] and __name__ != '__mp_main__':
+    with app.app_context():
+        from scheduler import init_scheduler
+        init_scheduler()
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
         from utils import create_default_admin
         create_default_admin()
-        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' and not app.config['SCHEDULER_AUTOSTART']:
             from scheduler import init_scheduler
             init_scheduler()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,150 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, delete, func, case, or_
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models import User, Task, ArchivedTask, ArchiveRollup
+from counters import TRACKED_FIELDS, OWNER_ROLES, ASSIGNEE_ROLES, task_roles, add_task_deltas, apply_deltas, upsert_increments
+from versions import bump_cache_version
+
+ARCHIVE_COLUMNS = ('id', 'title', 'description', 'priority', 'status', 'due_date', 'created_at', 'updated_at', 'created_by', 'assigned_to')
+
+def archive_cutoff(now=None):
+    return (now or datetime.utcnow()) - timedelta(days=current_app.config['ARCHIVE_AFTER_DAYS'])
+
+def archivable_condition(cutoff):
+    return (Task.status == 'completed') & (Task.updated_at < cutoff)
+
+def add_rollup_deltas(rollup_deltas, values, sign):
+    for user_id, task_role in task_roles(values['created_by'], values['assigned_to']):
+        rollup_deltas[(user_id, task_role, values['priority'])] += sign
+
+def apply_rollup_deltas(connection, rollup_deltas):
+    upsert_increments(connection, ArchiveRollup.__table__, [
+        {'user_id': user_id, 'task_role': task_role, 'priority': priority, 'count': delta}
+        for (user_id, task_role, priority), delta in sorted(rollup_deltas.items()) if delta
+    ])
+
+def archivable_rows(cutoff, batch_size):
+    tasks = Task.__table__
+    return select(*[tasks.c[key] for key in ARCHIVE_COLUMNS]) \
+        .where(archivable_condition(cutoff)) \
+        .order_by(tasks.c.updated_at, tasks.c.id) \
+        .limit(batch_size) \
+        .with_for_update(skip_locked=True)
+
+def archive_batch(cutoff, batch_size):
+    tasks = Task.__table__
+    rows = db.session.execute(archivable_rows(cutoff, batch_size)).all()
+    if not rows:
+        return 0
+
+    now = datetime.utcnow()
+    connection = db.session.connection()
+    db.session.execute(insert(ArchivedTask.__table__), [
+        dict({key: value for key, value in row._mapping.items() if key != 'id'}, task_id=row.id, archived_at=now) for row in rows
+    ])
+    db.session.execute(delete(tasks).where(tasks.c.id.in_([row.id for row in rows])))
+
+    counter_deltas = defaultdict(int)
+    bucket_deltas = defaultdict(int)
+    rollup_deltas = defaultdict(int)
+    for row in rows:
+        values = row._mapping
+        add_task_deltas(counter_deltas, bucket_deltas, {key: values[key] for key in TRACKED_FIELDS}, -1)
+        add_rollup_deltas(rollup_deltas, values, 1)
+    apply_deltas(connection, counter_deltas, bucket_deltas)
+    apply_rollup_deltas(connection, rollup_deltas)
+    bump_cache_version(connection, 'tasks')
+    db.session.commit()
+    return len(rows)
+
+def archive_completed_tasks(max_batches=None, batch_size=None):
+    config = current_app.config
+    batch_size = batch_size or config['ARCHIVE_BATCH_SIZE']
+    max_batches = max_batches or config['ARCHIVE_MAX_BATCHES']
+    cutoff = archive_cutoff()
+
+    archived = batches = 0
+    while batches < max_batches:
+        count = archive_batch(cutoff, batch_size)
+        archived += count
+        batches += 1
+        if count < batch_size:
+            break
+
+    if archived:
+        current_app.logger.info(f'Archived {archived} tasks completed before {cutoff:%Y-%m-%d %H:%M}')
+    return archived
+
+def count_archivable():
+    return db.session.query(func.count(Task.id)).filter(archivable_condition(archive_cutoff())).scalar()
+
+def rebuild_archive_rollups():
+    rollup_deltas = defaultdict(int)
+    rows = db.session.query(ArchivedTask.created_by, ArchivedTask.assigned_to, ArchivedTask.priority).yield_per(1000)
+    for created_by, assigned_to, priority in rows:
+        add_rollup_deltas(rollup_deltas, {'created_by': created_by, 'assigned_to': assigned_to, 'priority': priority}, 1)
+    connection = db.session.connection()
+    connection.execute(delete(ArchiveRollup.__table__))
+    apply_rollup_deltas(connection, rollup_deltas)
+    bump_cache_version(connection, 'tasks')
+    db.session.commit()
+    return len(rollup_deltas)
+
+def _rollup_scope(query, user):
+    if user is None or user.is_admin():
+        return query.filter(ArchiveRollup.task_role.in_(OWNER_ROLES))
+    return query.filter(ArchiveRollup.user_id == user.id)
+
+def _rollup_sum(condition):
+    return func.coalesce(func.sum(case((condition, ArchiveRollup.count), else_=0)), 0)
+
+def archive_totals(user=None):
+    query = db.session.query(
+        func.coalesce(func.sum(ArchiveRollup.count), 0),
+        _rollup_sum(ArchiveRollup.priority == 'high'),
+        _rollup_sum(ArchiveRollup.priority == 'medium'),
+        _rollup_sum(ArchiveRollup.priority == 'low'),
+    )
+    total, high, medium, low = _rollup_scope(query, user).one()
+    return {'total': total, 'priority': {'high': high, 'medium': medium, 'low': low}}
+
+def add_archive_totals(stats, user=None):
+    archived = archive_totals(user)
+    stats['total'] += archived['total']
+    stats['completed'] += archived['total']
+    for priority, count in archived['priority'].items():
+        stats['priority'][priority] += count
+    return stats
+
+def add_archive_analytics(stats):
+    rows = db.session.query(User.username, ArchiveRollup.task_role, ArchiveRollup.priority, ArchiveRollup.count) \
+        .join(User, User.id == ArchiveRollup.user_id).all()
+    assigned = defaultdict(int)
+    for username, task_role, priority, count in rows:
+        if task_role in OWNER_ROLES:
+            stats['total'] += count
+            stats['completed'] += count
+            stats['priority'][priority] += count
+        if task_role in ASSIGNEE_ROLES:
+            assigned[username] += count
+
+    for user in stats['users']:
+        count = assigned.get(user['username'], 0)
+        user['total_tasks'] += count
+        user['completed_tasks'] += count
+        total = user['total_tasks']
+        user['completion_rate'] = round((user['completed_tasks'] / total * 100), 2) if total > 0 else 0
+    return stats
+
+def archived_tasks_query(user, status=None, priority=None):
+    query = ArchivedTask.query.options(joinedload(ArchivedTask.assignee).load_only(User.id, User.username))
+    if not user.is_admin():
+        query = query.filter(or_(ArchivedTask.assigned_to == user.id, ArchivedTask.created_by == user.id))
+    if status:
+        query = query.filter(ArchivedTask.status == status)
+    if priority:
+        query = query.filter(ArchivedTask.priority == priority)
+    return query
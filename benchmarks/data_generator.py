@@ -0,0 +1,116 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'benchmark'
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'pa', 'do', 'gu')
+WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+WORD_WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+STATUSES = (('completed', 55), ('in_progress', 15), ('pending', 30))
+PRIORITIES = (('low', 30), ('medium', 50), ('high', 20))
+
+def sentence(rng, length):
+    return ' '.join(rng.choices(WORDS, WORD_WEIGHTS, k=length))
+
+def user_rows(count, hashed):
+    rows = [{'username': 'admin', 'email': 'admin@example.com', 'password': hashed, 'role': 'admin'}]
+    for i in range(1, count):
+        role = 'manager' if i % 50 == 1 else 'user'
+        rows.append({'username': f'user{i}', 'email': f'user{i}@example.com', 'password': hashed, 'role': role})
+    return rows
+
+def task_row(rng, now, user_ids, assignee_weights, managers, days):
+    created_at = now - timedelta(days=days * rng.random() ** 2, seconds=rng.randrange(86400))
+    assigned_to = rng.choices(user_ids, assignee_weights)[0] if rng.random() < 0.85 else None
+    if assigned_to is None or rng.random() < 0.6:
+        created_by = rng.choice(managers)
+    else:
+        created_by = assigned_to
+    status = rng.choices([s for s, _ in STATUSES], [w for _, w in STATUSES])[0]
+
+    due_date = None
+    if rng.random() < 0.8:
+        due_date = created_at + timedelta(hours=max(1.0, rng.gauss(7 * 24, 5 * 24)))
+        if status != 'completed' and rng.random() < 0.05:
+            due_date = now + timedelta(minutes=rng.randrange(24 * 60))
+
+    return {
+        'title': sentence(rng, 4),
+        'description': sentence(rng, 20) if rng.random() < 0.7 else None,
+        'priority': rng.choices([p for p, _ in PRIORITIES], [w for _, w in PRIORITIES])[0],
+        'status': status,
+        'due_date': due_date,
+        'created_at': created_at,
+        'updated_at': min(now, created_at + timedelta(hours=rng.expovariate(1 / 48))),
+        'created_by': created_by,
+        'assigned_to': assigned_to,
+        'reminder_sent_at': due_date if due_date and due_date < now else None,
+    }
+
+def generate(users, tasks, seed=42, days=365, chunk_size=5000, skew=1.1):
+    from sqlalchemy import insert
+    from extensions import db
+    from models import User, Task
+    from passwords import hash_password
+    from counters import rebuild_counters
+    from versions import bump_cache_version
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    db.session.execute(insert(User), user_rows(users, hash_password(PASSWORD)))
+    db.session.commit()
+
+    user_ids = [user_id for user_id, in db.session.query(User.id).filter(User.role != 'admin').order_by(User.id)]
+    managers = [user_id for user_id, in db.session.query(User.id).filter(User.role.in_(['admin', 'manager']))]
+    ranks = list(range(1, len(user_ids) + 1))
+    rng.shuffle(ranks)
+    assignee_weights = [1 / rank ** skew for rank in ranks]
+
+    created = 0
+    while created < tasks:
+        rows = [task_row(rng, now, user_ids, assignee_weights, managers, days) for _ in range(min(chunk_size, tasks - created))]
+        db.session.execute(insert(Task), rows)
+        db.session.commit()
+        created += len(rows)
+
+    rebuild_counters()
+    bump_cache_version(db.session.connection(), 'tasks')
+    bump_cache_version(db.session.connection(), 'users')
+    db.session.commit()
+
+def busiest_user():
+    from sqlalchemy import func
+    from extensions import db
+    from models import User, Task
+    return db.session.query(User.email).join(Task, Task.assigned_to == User.id).filter(User.role == 'user') \
+        .group_by(User.id, User.email).order_by(func.count(Task.id).desc()).limit(1).scalar()
+
+def main():
+    parser = argparse.ArgumentParser(description='Load synthetic users and tasks with realistic skew.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days', type=int, default=365, help='Spread of task creation dates')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of the assignee distribution')
+    parser.add_argument('--database-url', help='Empty database to load; defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "bench.db")}'
+    from app import app
+    from extensions import db
+
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        generate(args.users, args.tasks, args.seed, args.days, skew=args.skew)
+        print(f'Loaded {args.users} users and {args.tasks} tasks into {os.environ["DATABASE_URL"]} in {time.perf_counter() - start:.1f}s')
+        print(f'All users have the password {PASSWORD!r}; admin@example.com is the admin, {busiest_user()} has the most tasks')
+
+if __name__ == '__main__':
+    main()
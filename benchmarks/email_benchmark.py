@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    sys.exit('This benchmark needs a local SMTP stand-in: pip install aiosmtpd')
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 OK'
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure outbox delivery throughput against a local SMTP server.')
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--port', type=int, default=8025)
+    args = parser.parse_args()
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=args.port)
+    controller.start()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "email.db")}'
+    from app import app
+    from extensions import db, mail
+    from flask_mail import Message
+    from models import User
+    from email_service import queue_email, deliver_outbox
+
+    app.config.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=args.port, MAIL_USE_TLS=False,
+                      MAIL_USERNAME=None, MAIL_PASSWORD=None)
+    mail.init_app(app)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            users = [User(username=f'user{i}', email=f'user{i}@example.com', password='x') for i in range(args.messages)]
+            db.session.add_all(users)
+            db.session.commit()
+
+            start = time.perf_counter()
+            for user in users:
+                mail.send(Message(subject='Baseline', recipients=[user.email], body='One connection per message'))
+            baseline = args.messages / (time.perf_counter() - start)
+
+            for user in users:
+                queue_email(user, 'benchmark', 'Outbox', 'Batched over one connection per batch')
+            db.session.commit()
+
+            start = time.perf_counter()
+            sent, failed = deliver_outbox(batch_size=args.batch_size)
+            batched = sent / (time.perf_counter() - start)
+
+        print(f'mail.send per message: {baseline:.0f} messages/s')
+        print(f'outbox batches of {args.batch_size}: {batched:.0f} messages/s ({sent} sent, {failed} failed)')
+        print(f'SMTP server received {handler.received} messages')
+    finally:
+        controller.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+import argparse
+import http.cookiejar
+import json
+import logging
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_generator import PASSWORD, WORDS, generate, busiest_user
+
+ADMIN_EMAIL = 'admin@example.com'
+SCENARIOS = {
+    'dashboard': ('user', 'GET', '/dashboard', None),
+    'dashboard_filter': ('user', 'GET', '/dashboard?status=pending&priority=high', None),
+    'dashboard_search': ('user', 'GET', f'/dashboard?search={WORDS[3]}+{WORDS[20][:4]}', None),
+    'dashboard_admin': ('admin', 'GET', '/dashboard', None),
+    'analytics': ('admin', 'GET', '/analytics', None),
+    'new_task': ('user', 'POST', '/task/new', {'title': 'Load test task', 'priority': 'medium', 'status': 'pending', 'assigned_to': '0'}),
+    'login': (None, 'POST', '/login', None),
+}
+METRIC_PATTERN = re.compile(r'^http_request_sql_statements_(sum|count)\{endpoint="([^"]+)"\} ([0-9.e+]+)$', re.M)
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+def percentiles(latencies):
+    if len(latencies) < 2:
+        value = latencies[0] if latencies else 0.0
+        return value, value, value
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return quantiles[49], quantiles[94], quantiles[98]
+
+def result(latencies, elapsed, statements):
+    p50, p95, p99 = percentiles(latencies)
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+        'queries_per_request': statements / len(latencies) if latencies and statements is not None else None,
+    }
+
+def run_client_mode(app, scenarios, requests, user_email):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    counter = StatementCounter()
+    event.listen(Engine, 'before_cursor_execute', counter)
+    clients = {}
+    for persona, email in (('user', user_email), ('admin', ADMIN_EMAIL)):
+        clients[persona] = app.test_client()
+        clients[persona].post('/login', data={'email': email, 'password': PASSWORD})
+
+    results = {}
+    for name in scenarios:
+        latencies = []
+        counter.count = 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            latencies.append(client_request(app, clients, name, user_email))
+        results[name] = result(latencies, time.perf_counter() - start, counter.count)
+    results['check_due_tasks'] = time_check_due_tasks(app, counter, max(1, requests // 10))
+    event.remove(Engine, 'before_cursor_execute', counter)
+    return results
+
+def client_request(app, clients, name, user_email):
+    persona, method, path, data = SCENARIOS[name]
+    start = time.perf_counter()
+    if name == 'login':
+        response = app.test_client().post(path, data={'email': user_email, 'password': PASSWORD})
+    elif method == 'POST':
+        response = clients[persona].post(path, data=data)
+    else:
+        response = clients[persona].get(path)
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code >= 400:
+        raise RuntimeError(f'{name} returned {response.status_code}')
+    return elapsed
+
+def undo_reminders(run_started_at, first_email_id, lease_marks):
+    from sqlalchemy import update, delete
+    from extensions import db
+    from models import Task, OutboxEmail, SchedulerLease
+    tasks = Task.__table__
+    emails = OutboxEmail.__table__
+    db.session.execute(update(tasks).where(tasks.c.reminder_sent_at >= run_started_at)
+                       .values(reminder_sent_at=None, updated_at=tasks.c.updated_at))
+    db.session.execute(delete(emails).where(emails.c.id > first_email_id))
+    lease = db.session.get(SchedulerLease, 'reminders')
+    if lease is not None:
+        lease.high_water_mark, lease.last_success_at = lease_marks
+    db.session.commit()
+
+def time_check_due_tasks(app, counter, runs):
+    from sqlalchemy import func
+    from extensions import db
+    from models import OutboxEmail, SchedulerLease
+    from scheduler import check_due_tasks
+    latencies = []
+    statements = 0
+    app.logger.setLevel(logging.WARNING)
+    with app.app_context():
+        first_email_id = db.session.query(func.max(OutboxEmail.id)).scalar() or 0
+        lease = db.session.get(SchedulerLease, 'reminders')
+        lease_marks = (lease.high_water_mark, lease.last_success_at) if lease else (None, None)
+        for _ in range(runs):
+            counter.count = 0
+            run_started_at = datetime.utcnow()
+            run_start = time.perf_counter()
+            check_due_tasks()
+            latencies.append((time.perf_counter() - run_start) * 1000)
+            statements += counter.count
+            undo_reminders(run_started_at, first_email_id, lease_marks)
+    return result(latencies, sum(latencies) / 1000, statements)
+
+def http_client(base_url, email):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    while email:
+        try:
+            opener.open(base_url + '/login', data=urllib.parse.urlencode({'email': email, 'password': PASSWORD}).encode()).read()
+            break
+        except urllib.error.HTTPError as e:
+            if e.code != 429:
+                raise
+            time.sleep(0.1)
+    return opener
+
+def sql_statements_by_endpoint(base_url):
+    try:
+        token = os.environ.get('METRICS_TOKEN')
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        text = urllib.request.urlopen(urllib.request.Request(base_url + '/metrics', headers=headers)).read().decode()
+    except (urllib.error.URLError, OSError):
+        return None
+    totals = {}
+    for kind, endpoint, value in METRIC_PATTERN.findall(text):
+        totals.setdefault(endpoint, {})[kind] = float(value)
+    return totals
+
+def run_http_mode(base_url, scenarios, concurrency, duration, user_email):
+    endpoints = {'dashboard': 'dashboard', 'dashboard_filter': 'dashboard', 'dashboard_search': 'dashboard',
+                 'dashboard_admin': 'dashboard', 'analytics': 'analytics', 'new_task': 'new_task', 'login': 'login'}
+    results = {}
+    for name in scenarios:
+        persona, method, path, data = SCENARIOS[name]
+        email = {'user': user_email, 'admin': ADMIN_EMAIL}.get(persona)
+        body = urllib.parse.urlencode(data or {'email': user_email, 'password': PASSWORD}).encode() if method == 'POST' else None
+        before = sql_statements_by_endpoint(base_url)
+        latencies = []
+        errors = []
+        openers = [http_client(base_url, email) for _ in range(concurrency)]
+        deadline = time.perf_counter() + duration
+
+        def worker(opener):
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    (opener if persona else http_client(base_url, None)).open(base_url + path, data=body).read()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except (urllib.error.URLError, OSError) as e:
+                    errors.append(e)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(opener,)) for opener in openers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        after = sql_statements_by_endpoint(base_url)
+        statements = None
+        if before is not None and after is not None:
+            endpoint = endpoints[name]
+            delta_sum = after.get(endpoint, {}).get('sum', 0) - before.get(endpoint, {}).get('sum', 0)
+            delta_count = after.get(endpoint, {}).get('count', 0) - before.get(endpoint, {}).get('count', 0)
+            statements = delta_sum / delta_count * len(latencies) if delta_count else None
+        results[name] = result(latencies, elapsed, statements)
+        if errors:
+            results[name]['errors'] = len(errors)
+    return results
+
+def report(results, baseline, tolerance):
+    regressions = []
+    print(f'{"scenario":<18} {"requests":>8} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8}  vs baseline p95')
+    for name, values in results.items():
+        queries = values['queries_per_request']
+        line = (f'{name:<18} {values["requests"]:>8} {values["throughput"]:>8.1f} {values["p50_ms"]:>8.1f} '
+                f'{values["p95_ms"]:>8.1f} {values["p99_ms"]:>8.1f} {queries if queries is not None else float("nan"):>8.1f}')
+        previous = (baseline or {}).get(name)
+        if previous and previous['p95_ms']:
+            change = (values['p95_ms'] - previous['p95_ms']) / previous['p95_ms']
+            line += f'  {change:+.0%}'
+            if change > tolerance:
+                line += ' REGRESSION'
+                regressions.append(name)
+            if queries is not None and previous.get('queries_per_request') is not None and queries > previous['queries_per_request'] + 0.5:
+                line += f' (queries {previous["queries_per_request"]:.1f} -> {queries:.1f})'
+                regressions.append(name)
+        if values.get('errors'):
+            line += f'  {values["errors"]} errors'
+        print(line)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the main pages against synthetic data.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--tasks', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='Database to use; defaults to a temporary SQLite file')
+    parser.add_argument('--skip-load', action='store_true', help='Use the data already in --database-url')
+    parser.add_argument('--mode', choices=('client', 'http'), default='client')
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=100, help='Requests per scenario in client mode')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients in http mode')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per scenario in http mode')
+    parser.add_argument('--base-url', help='Benchmark a running server in http mode instead of starting one')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed p95 slowdown before flagging a regression')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "load.db")}'
+    from app import app
+    from extensions import db
+
+    app.config.update(WTF_CSRF_ENABLED=False, QUERY_BUDGET_ENABLED=False)
+    with app.app_context():
+        if not args.skip_load:
+            db.create_all()
+            generate(args.users, args.tasks, args.seed)
+        user_email = busiest_user()
+
+    if args.mode == 'client':
+        results = run_client_mode(app, args.scenarios, args.requests, user_email)
+    elif args.base_url:
+        results = run_http_mode(args.base_url.rstrip('/'), args.scenarios, args.concurrency, args.duration, user_email)
+    else:
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server = make_server('127.0.0.1', args.port, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            results = run_http_mode(f'http://127.0.0.1:{args.port}', args.scenarios, args.concurrency, args.duration, user_email)
+        finally:
+            server.shutdown()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        if saved['mode'] != args.mode:
+            print(f'Baseline was recorded in {saved["mode"]} mode; latencies are not comparable')
+        baseline = saved['scenarios']
+    regressions = report(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'mode': args.mode, 'scenarios': results}, f, indent=2, sort_keys=True)
+    if regressions:
+        print(f'Regressions: {", ".join(sorted(set(regressions)))}')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
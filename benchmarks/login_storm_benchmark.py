@@ -0,0 +1,98 @@
+import argparse
+import http.cookiejar
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def client():
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+def login(opener, base_url, email, password):
+    data = urllib.parse.urlencode({'email': email, 'password': password}).encode()
+    try:
+        opener.open(base_url + '/login', data=data).read()
+        return 200
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def dashboard_latencies(opener, base_url, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        opener.open(base_url + '/dashboard').read()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def summary(latencies):
+    quantiles = statistics.quantiles(latencies, n=100)
+    return f'p50 {quantiles[49]:.1f}ms, p95 {quantiles[94]:.1f}ms, max {max(latencies):.1f}ms'
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure dashboard latency while a burst of logins is in progress.')
+    parser.add_argument('--storm-threads', type=int, default=16)
+    parser.add_argument('--dashboard-requests', type=int, default=200)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--inline', action='store_true', help='Hash on the request thread instead of the worker pool')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "storm.db")}'
+    from werkzeug.serving import make_server
+    from app import app
+    from extensions import db
+    from models import User
+    from passwords import hash_password, init_password_hasher
+
+    app.config.update(WTF_CSRF_ENABLED=False, QUERY_BUDGET_ENABLED=False)
+    if args.inline:
+        app.config.update(PASSWORD_HASH_WORKERS=0, PASSWORD_HASH_MAX_PENDING=10000)
+    init_password_hasher(app)
+
+    with app.app_context():
+        db.create_all()
+        hashed = hash_password('benchmark')
+        db.session.add_all([User(username=f'user{i}', email=f'user{i}@example.com', password=hashed)
+                            for i in range(args.storm_threads + 1)])
+        db.session.commit()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', args.port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{args.port}'
+
+    try:
+        viewer = client()
+        login(viewer, base_url, 'user0@example.com', 'benchmark')
+        print(f'idle dashboard: {summary(dashboard_latencies(viewer, base_url, args.dashboard_requests))}')
+
+        stop = threading.Event()
+        outcomes = []
+
+        def storm(i):
+            while not stop.is_set():
+                outcomes.append(login(client(), base_url, f'user{i}@example.com', 'benchmark'))
+
+        threads = [threading.Thread(target=storm, args=(i,)) for i in range(1, args.storm_threads + 1)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+        latencies = dashboard_latencies(viewer, base_url, args.dashboard_requests)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        print(f'dashboard during login storm: {summary(latencies)}')
+        print(f'logins: {outcomes.count(200)} accepted, {outcomes.count(429)} rejected with 429')
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
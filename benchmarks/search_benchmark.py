@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_generator import WORDS, sentence
+
+QUERIES = (WORDS[5], WORDS[300][:4], f'{WORDS[40]} {WORDS[90]}', WORDS[1500], 'nonexistentterm')
+
+def load_tasks(db, count, user_id, rng, chunk_size=10000):
+    from models import Task
+    created = 0
+    while created < count:
+        rows = [{
+            'title': sentence(rng, 4),
+            'description': sentence(rng, 30),
+            'priority': rng.choice(('low', 'medium', 'high')),
+            'status': rng.choice(('pending', 'in_progress', 'completed')),
+            'created_by': user_id,
+        } for _ in range(min(chunk_size, count - created))]
+        db.session.execute(db.insert(Task), rows)
+        db.session.commit()
+        created += len(rows)
+
+def time_queries(app, backend, repeat):
+    from search import search_tasks
+    app.config['SEARCH_BACKEND'] = backend
+    timings = []
+    for q in QUERIES:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            search_tasks(None, q, limit=10).all()
+        timings.append((time.perf_counter() - start) / repeat * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare task search backends on synthetic data.')
+    parser.add_argument('--tasks', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--database-url', help='Empty database to load; defaults to a temporary SQLite file')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = args.database_url or f'sqlite:///{os.path.join(workdir, "search.db")}'
+    from app import app
+    from extensions import db
+    from models import User
+
+    rng = random.Random(42)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+
+        loaded = 0
+        for target in sorted(args.tasks):
+            load_tasks(db, target - loaded, user.id, rng)
+            loaded = target
+            for backend in ('like', 'auto'):
+                timings = time_queries(app, backend, args.repeat)
+                summary = ', '.join(f'{q!r} {ms:.1f}ms' for q, ms in zip(QUERIES, timings))
+                print(f'{loaded} tasks, {backend}: {summary}')
+
+if __name__ == '__main__':
+    main()
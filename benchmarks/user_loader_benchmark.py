@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare authenticated request throughput with and without the principal cache.')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--path', default='/users/lookup?q=a')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "loader.db")}'
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import app
+    from extensions import db, bcrypt
+    from models import User
+    from principal import init_principal_cache
+
+    statements = [0]
+    event.listen(Engine, 'before_cursor_execute', lambda *a: statements.__setitem__(0, statements[0] + 1))
+
+    app.config.update(WTF_CSRF_ENABLED=False, QUERY_BUDGET_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='bench', email='bench@example.com', role='manager',
+                            password=bcrypt.generate_password_hash('benchmark').decode('utf-8')))
+        db.session.commit()
+
+    for label, ttl in (('uncached', 0), ('cached', 60)):
+        app.config['PRINCIPAL_CACHE_TTL'] = ttl
+        init_principal_cache(app)
+        client = app.test_client()
+        client.post('/login', data={'email': 'bench@example.com', 'password': 'benchmark'})
+        client.get(args.path)
+
+        statements[0] = 0
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            client.get(args.path)
+        elapsed = time.perf_counter() - start
+        print(f'{label}: {args.requests / elapsed:.0f} requests/s, {statements[0] / args.requests:.2f} SQL statements per request')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+import codecs
+import csv
+import io
+import json
+from collections import defaultdict
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy import insert, select, update, delete, case, and_, true
+from sqlalchemy.orm import aliased, load_only
+from werkzeug.datastructures import MultiDict
+from extensions import db
+from models import User, Task
+from forms import TaskForm
+from counters import TRACKED_FIELDS, add_task_deltas, apply_deltas
+from directory import assignee_choices, user_directory
+from stats import user_scope
+from versions import bump_cache_version
+from events import EVENT_FIELDS, task_event, assignment_events, record_task_events
+
+TASK_FIELDS = ('title', 'description', 'priority', 'status', 'due_date', 'assigned_to')
+EXPORT_FIELDS = ('id', 'title', 'description', 'priority', 'status', 'due_date', 'assigned_to', 'assignee', 'created_by', 'created_at', 'updated_at')
+DATE_FORMAT = '%Y-%m-%dT%H:%M'
+BULK_ACTIONS = ('update', 'delete')
+BULK_FIELDS = ('status', 'priority', 'assigned_to')
+
+def detect_format(fmt, filename, content_type):
+    if fmt in ('csv', 'ndjson'):
+        return fmt
+    if (filename or '').endswith(('.ndjson', '.jsonl')) or 'ndjson' in (content_type or ''):
+        return 'ndjson'
+    return 'csv'
+
+def parse_rows(stream, fmt):
+    if fmt == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            try:
+                line = line.decode('utf-8')
+            except UnicodeDecodeError as e:
+                yield line_number, None, {'row': [f'Invalid UTF-8: {e}']}
+                continue
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, {'row': [f'Invalid JSON: {e}']}
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, {'row': ['Each line must be a JSON object']}
+                continue
+            yield line_number, row, None
+    else:
+        reader = csv.DictReader(codecs.iterdecode(stream, 'utf-8'))
+        try:
+            for row in reader:
+                yield reader.line_num, row, None
+        except UnicodeDecodeError as e:
+            yield reader.line_num + 1, None, {'file': [f'Invalid UTF-8, the rest of the file was skipped: {e}']}
+        except csv.Error as e:
+            yield reader.line_num, None, {'file': [f'Invalid CSV, the rest of the file was skipped: {e}']}
+
+def validate_row(row, user, directory):
+    values = {key: '' if row.get(key) is None else str(row.get(key)) for key in TASK_FIELDS}
+    if not values['assigned_to'] and row.get('assignee'):
+        values['assigned_to'] = str(directory.ids.get(row['assignee']) or -1)
+    values['assigned_to'] = values['assigned_to'] or '0'
+    values['priority'] = values['priority'] or 'medium'
+    values['status'] = values['status'] or 'pending'
+
+    form = TaskForm(formdata=MultiDict(values), meta={'csrf': False})
+    assigned_to = form.assigned_to.data if isinstance(form.assigned_to.data, int) else None
+    form.assigned_to.choices = assignee_choices(user.id, assigned_to, directory=directory)
+    if not form.validate():
+        return None, {key: errors for key, errors in form.errors.items() if key != 'submit'}
+
+    assigned_to = form.assigned_to.data or None
+    if assigned_to and assigned_to != user.id and not user.is_manager():
+        return None, {'assigned_to': ['Only managers and admins can assign tasks to other users.']}
+
+    return {
+        'title': form.title.data,
+        'description': form.description.data or None,
+        'priority': form.priority.data,
+        'status': form.status.data,
+        'due_date': form.due_date.data,
+        'created_by': user.id,
+        'assigned_to': assigned_to
+    }, None
+
+def _insert_chunk(rows, user):
+    from email_service import queue_task_assignment_emails
+
+    tasks = db.session.scalars(insert(Task).returning(Task).execution_options(render_nulls=True), rows).all()
+
+    _apply_counter_deltas((task, 1) for task in tasks)
+    bump_cache_version(db.session.connection(), 'tasks')
+    record_task_events(db.session, [event for task in tasks
+                                    for event in assignment_events('task.created', {key: getattr(task, key) for key in EVENT_FIELDS})])
+    queue_task_assignment_emails(_with_assignees([task for task in tasks if task.assigned_to]))
+
+    db.session.commit()
+    return len(tasks)
+
+def _apply_counter_deltas(changes):
+    counter_deltas = defaultdict(int)
+    bucket_deltas = defaultdict(int)
+    for task, sign in changes:
+        add_task_deltas(counter_deltas, bucket_deltas, {key: getattr(task, key) for key in TRACKED_FIELDS}, sign)
+    apply_deltas(db.session.connection(), counter_deltas, bucket_deltas)
+
+def _with_assignees(tasks):
+    assignee_ids = {task.assigned_to for task in tasks}
+    if not assignee_ids:
+        return []
+    assignees = {u.id: u for u in User.query.options(load_only(User.username, User.email)).filter(User.id.in_(assignee_ids))}
+    return [(assignees[task.assigned_to], task) for task in tasks if task.assigned_to in assignees]
+
+def import_tasks(stream, fmt, user):
+    chunk_size = current_app.config['IMPORT_CHUNK_SIZE']
+    max_errors = current_app.config['IMPORT_MAX_ERRORS']
+    created = 0
+    errors = []
+    chunk = []
+    directory = user_directory()
+
+    for line_number, row, parse_errors in parse_rows(stream, fmt):
+        if parse_errors is None:
+            values, row_errors = validate_row(row, user, directory)
+        else:
+            values, row_errors = None, parse_errors
+        if row_errors:
+            if len(errors) < max_errors:
+                errors.append({'line': line_number, 'errors': row_errors})
+            continue
+
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            created += _insert_chunk(chunk, user)
+            chunk = []
+            directory = user_directory()
+
+    if chunk:
+        created += _insert_chunk(chunk, user)
+    return {'created': created, 'failed': len(errors), 'errors': errors}
+
+def parse_task_ids(value, from_form=False):
+    if from_form:
+        try:
+            return [int(task_id) for task_id in value]
+        except ValueError:
+            return None
+    if not isinstance(value, list) or not all(type(task_id) is int for task_id in value):
+        return None
+    return value
+
+def bulk_changes(values, user):
+    form = TaskForm(formdata=None, meta={'csrf': False})
+    changes = {}
+    errors = {}
+    for field in ('status', 'priority'):
+        value = values.get(field)
+        if value:
+            if isinstance(value, str) and value in dict(getattr(form, field).choices):
+                changes[field] = value
+            else:
+                errors[field] = ['Not a valid choice.']
+
+    assigned_to = values.get('assigned_to')
+    if assigned_to not in (None, ''):
+        try:
+            assigned_to = int(assigned_to)
+        except (TypeError, ValueError):
+            assigned_to = -1
+        if assigned_to == 0:
+            changes['assigned_to'] = None
+        elif assigned_to in user_directory().names:
+            changes['assigned_to'] = assigned_to
+        else:
+            errors['assigned_to'] = ['Not a valid choice.']
+    return changes, errors
+
+def bulk_permission(user, action, changes):
+    if action == 'delete':
+        conditions = [] if user.is_admin() else [Task.created_by == user.id]
+    else:
+        scope = user_scope(user)
+        conditions = [] if scope is None else [scope]
+        new_assignee = changes.get('assigned_to')
+        if new_assignee and new_assignee != user.id and not user.is_manager():
+            conditions.append(Task.assigned_to == new_assignee)
+    return and_(*conditions) if conditions else true()
+
+def apply_bulk_action(user, task_ids, action, changes):
+    from email_service import queue_task_assignment_emails
+
+    task_ids = sorted(set(task_ids))
+    permission = bulk_permission(user, action, changes)
+    rows = db.session.execute(
+        select(Task.id, Task.title, Task.description, Task.due_date, *[getattr(Task, key) for key in TRACKED_FIELDS if key != 'due_date'],
+               case((permission, True), else_=False).label('allowed'))
+        .where(Task.id.in_(task_ids))
+        .with_for_update()
+    ).all()
+    found = {row.id: row for row in rows}
+    allowed = [row.id for row in rows if row.allowed]
+
+    done = set()
+    if allowed:
+        if action == 'delete':
+            statement = delete(Task)
+        else:
+            statement = update(Task).values(**changes)
+        done = set(db.session.scalars(
+            statement.where(Task.id.in_(allowed), permission).returning(Task.id)
+            .execution_options(synchronize_session=False)
+        ))
+
+    old_tasks = [found[task_id] for task_id in sorted(done)]
+    if done:
+        bump_cache_version(db.session.connection(), 'tasks')
+    if action == 'delete':
+        _apply_counter_deltas((task, -1) for task in old_tasks)
+        record_task_events(db.session, [task_event('task.deleted', task._asdict()) for task in old_tasks])
+    else:
+        new_tasks = [SimpleNamespace(**{**task._asdict(), **changes}) for task in old_tasks]
+        _apply_counter_deltas([(task, -1) for task in old_tasks] + [(task, 1) for task in new_tasks])
+        record_task_events(db.session, [event for old, new in zip(old_tasks, new_tasks)
+                                        for event in assignment_events('task.updated', vars(new), old.assigned_to)])
+        if changes.get('assigned_to'):
+            reassigned = [new for old, new in zip(old_tasks, new_tasks) if old.assigned_to != new.assigned_to]
+            queue_task_assignment_emails(_with_assignees(reassigned))
+    db.session.commit()
+
+    outcome = 'deleted' if action == 'delete' else 'updated'
+    results = [
+        {'id': task_id, 'outcome': outcome if task_id in done else 'forbidden' if task_id in found else 'not_found'}
+        for task_id in task_ids
+    ]
+    return {'succeeded': len(done), 'failed': len(task_ids) - len(done), 'results': results}
+
+def export_rows(user, status=None, priority=None):
+    assignee = aliased(User)
+    query = select(
+        Task.id, Task.title, Task.description, Task.priority, Task.status, Task.due_date,
+        Task.assigned_to, assignee.username, Task.created_by, Task.created_at, Task.updated_at
+    ).outerjoin(assignee, assignee.id == Task.assigned_to).order_by(Task.id)
+
+    scope = user_scope(user)
+    if scope is not None:
+        query = query.where(scope)
+    if status:
+        query = query.where(Task.status == status)
+    if priority:
+        query = query.where(Task.priority == priority)
+
+    result = db.session.execute(query.execution_options(yield_per=current_app.config['EXPORT_CHUNK_SIZE']))
+    for row in result:
+        values = dict(zip(EXPORT_FIELDS, row))
+        for key in ('due_date', 'created_at', 'updated_at'):
+            if values[key] is not None:
+                values[key] = values[key].strftime(DATE_FORMAT)
+        yield values
+
+def export_tasks(user, fmt, status=None, priority=None):
+    rows = export_rows(user, status, priority)
+    if fmt == 'ndjson':
+        for values in rows:
+            yield json.dumps(values) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for values in rows:
+        writer.writerow(values)
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
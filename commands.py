@@ -0,0 +1,97 @@
+import click
+
+def register_commands(app):
+    @app.cli.command('rebuild-counters')
+    def rebuild_counters_command():
+        from counters import rebuild_counters
+        counters, buckets = rebuild_counters()
+        click.echo(f'Rebuilt {counters} task counters and {buckets} due-date buckets')
+
+    @app.cli.command('check-counters')
+    def check_counters_command():
+        from counters import check_counters
+        mismatches = check_counters()
+        for name, key, expected, stored in mismatches:
+            click.echo(f'{name} {key}: expected {expected}, stored {stored}')
+        if mismatches:
+            raise SystemExit(f'{len(mismatches)} counter mismatches found; run "flask rebuild-counters"')
+        click.echo('Task counters are consistent')
+
+    @app.cli.command('create-indexes')
+    def create_indexes_command():
+        from extensions import db
+        from models import Task
+        dialect = db.engine.dialect.name
+        for index in Task.__table__.indexes:
+            dialects = index._ddl_if.dialect if index._ddl_if else None
+            if isinstance(dialects, str):
+                dialects = (dialects,)
+            if dialects and dialect not in dialects:
+                click.echo(f'Skipped index {index.name} (only created on {", ".join(dialects)})')
+                continue
+            index.create(db.engine, checkfirst=True)
+            click.echo(f'Ensured index {index.name}')
+
+    @app.cli.command('check-query-plans')
+    def check_query_plans_command():
+        from query_plans import check_query_plans
+        failures = 0
+        for name, (plan, full_scan) in check_query_plans().items():
+            click.echo(f'{"FULL SCAN" if full_scan else "ok"}: {name}')
+            for line in plan:
+                click.echo(f'    {line}')
+            failures += full_scan
+        if failures:
+            raise SystemExit(f'{failures} task queries fall back to a full table scan')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        from search import rebuild_search_index
+        dialect = rebuild_search_index()
+        click.echo(f'Rebuilt task search index for {dialect}')
+
+    @app.cli.command('send-outbox')
+    def send_outbox_command():
+        from email_service import deliver_outbox
+        sent, failed = deliver_outbox()
+        click.echo(f'Sent {sent} queued emails, {failed} failed')
+
+    @app.cli.command('send-reminders')
+    @click.option('--dry-run', is_flag=True, help='Report how many reminder emails would be queued without queueing them.')
+    def send_reminders_command(dry_run):
+        from scheduler import check_due_tasks, run_exclusive
+        if dry_run:
+            check_due_tasks(dry_run=True)
+        elif not run_exclusive(app, 'reminders', check_due_tasks):
+            raise SystemExit('Another worker holds the reminders lease; try again later')
+
+    @app.cli.command('archive-tasks')
+    @click.option('--dry-run', is_flag=True, help='Report how many completed tasks are old enough to archive without moving them.')
+    def archive_tasks_command(dry_run):
+        from archive import count_archivable
+        from scheduler import archive_tasks, run_exclusive
+        if app.config['ARCHIVE_AFTER_DAYS'] <= 0:
+            raise SystemExit('Archiving is disabled; set ARCHIVE_AFTER_DAYS to a positive number of days')
+        if dry_run:
+            click.echo(f'{count_archivable()} completed tasks are ready to archive')
+        elif not run_exclusive(app, 'archive', archive_tasks):
+            raise SystemExit('Another worker holds the archive lease; try again later')
+
+    @app.cli.command('rebuild-archive-rollups')
+    def rebuild_archive_rollups_command():
+        from archive import rebuild_archive_rollups
+        rollups = rebuild_archive_rollups()
+        click.echo(f'Rebuilt {rollups} archive rollups')
+
+    @app.cli.command('run-scheduler')
+    def run_scheduler_command():
+        from scheduler import run_scheduler
+        run_scheduler()
+
+    @app.cli.command('scheduler-status')
+    def scheduler_status_command():
+        from scheduler import scheduler_status
+        for lease in scheduler_status():
+            click.echo(f'{lease.name}: {lease.runs} runs, {lease.failures} failures, last run {lease.last_started_at} '
+                       f'took {lease.last_duration_ms} ms, lag {lease.last_lag_seconds} s, {lease.last_interval_seconds} s since the previous run, '
+                       f'next due {lease.next_due_at}, lease held by {lease.owner} until {lease.expires_at}')
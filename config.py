@@ -4,6 +4,21 @@ class Config:
     SECRET_KEY = os.environ.get('SESSION_SECRET', 'dev-secret-key-change-in-production')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    READ_AFTER_WRITE_SECONDS = int(os.environ.get('READ_AFTER_WRITE_SECONDS', 10))
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ['true', 'on', '1']
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'false').lower() in ['true', 'on', '1']
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+    
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 2 * (os.cpu_count() or 1)))
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
     
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
@@ -11,3 +26,63 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@taskmanager.com')
+    
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+    OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('OUTBOX_RETRY_BASE_SECONDS', 60))
+    OUTBOX_POLL_SECONDS = int(os.environ.get('OUTBOX_POLL_SECONDS', 10))
+    
+    REMINDER_WINDOW_HOURS = int(os.environ.get('REMINDER_WINDOW_HOURS', 24))
+    REMINDER_GROUP_BY = os.environ.get('REMINDER_GROUP_BY', 'assignee')
+    REMINDER_CHUNK_SIZE = int(os.environ.get('REMINDER_CHUNK_SIZE', 500))
+    REMINDER_POLL_SECONDS = int(os.environ.get('REMINDER_POLL_SECONDS', 300))
+    REMINDER_OVERLAP_SECONDS = int(os.environ.get('REMINDER_OVERLAP_SECONDS', 300))
+    
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 90))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))
+    ARCHIVE_MAX_BATCHES = int(os.environ.get('ARCHIVE_MAX_BATCHES', 20))
+    ARCHIVE_POLL_SECONDS = int(os.environ.get('ARCHIVE_POLL_SECONDS', 3600))
+    
+    SCHEDULER_AUTOSTART = os.environ.get('SCHEDULER_AUTOSTART', 'false').lower() == 'true'
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS', 600))
+    
+    TASK_COUNTERS_ENABLED = os.environ.get('TASK_COUNTERS_ENABLED', 'true').lower() == 'true'
+    
+    DASHBOARD_EXACT_COUNT = os.environ.get('DASHBOARD_EXACT_COUNT', 'true').lower() == 'true'
+    DASHBOARD_PAGE_LINKS_MAX = int(os.environ.get('DASHBOARD_PAGE_LINKS_MAX', 20))
+    
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+    
+    QUERY_BUDGET_ENABLED = {'true': True, 'false': False}.get(os.environ.get('QUERY_BUDGET_ENABLED', '').lower())
+    QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'false').lower() == 'true'
+    
+    PRINCIPAL_CACHE_BACKEND = os.environ.get('PRINCIPAL_CACHE_BACKEND', 'local')
+    PRINCIPAL_CACHE_REDIS_URL = os.environ.get('PRINCIPAL_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000))
+    
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 500))
+    IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 1000))
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))
+    BULK_ACTION_MAX_TASKS = int(os.environ.get('BULK_ACTION_MAX_TASKS', 500))
+    
+    API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 20))
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 100))
+    
+    EVENTS_ENABLED = os.environ.get('EVENTS_ENABLED', 'false').lower() in ['true', 'on', '1']
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'local')
+    EVENTS_REDIS_URL = os.environ.get('EVENTS_REDIS_URL', 'redis://localhost:6379/0')
+    EVENTS_REDIS_CHANNEL = os.environ.get('EVENTS_REDIS_CHANNEL', 'task-events')
+    EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+    EVENTS_KEEPALIVE_SECONDS = int(os.environ.get('EVENTS_KEEPALIVE_SECONDS', 25))
+    
+    STATS_CACHE_BACKEND = os.environ.get('STATS_CACHE_BACKEND', 'local')
+    STATS_CACHE_REDIS_URL = os.environ.get('STATS_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    STATS_CACHE_SIZE = int(os.environ.get('STATS_CACHE_SIZE', 256))
+    STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL', 60))
+    STATS_CACHE_MAX_STALE = int(os.environ.get('STATS_CACHE_MAX_STALE', 600))
+    
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 0))
+    SLOW_REQUEST_TOP_STATEMENTS = int(os.environ.get('SLOW_REQUEST_TOP_STATEMENTS', 5))
@@ -0,0 +1,207 @@
+from collections import defaultdict
+from datetime import datetime, time
+from sqlalchemy import event, inspect, func, case, update, insert, delete
+from sqlalchemy.orm import Session
+from extensions import db
+from models import User, Task, TaskCounter, TaskDueBucket
+from stats import user_scope, overdue_condition
+from query_budget import unbudgeted
+
+TRACKED_FIELDS = ('created_by', 'assigned_to', 'status', 'priority', 'due_date')
+OWNER_ROLES = ('creator', 'both')
+ASSIGNEE_ROLES = ('assignee', 'both')
+
+def task_roles(created_by, assigned_to):
+    if assigned_to is not None and assigned_to == created_by:
+        return [(created_by, 'both')]
+    roles = [(created_by, 'creator')]
+    if assigned_to is not None:
+        roles.append((assigned_to, 'assignee'))
+    return roles
+
+def add_task_deltas(counter_deltas, bucket_deltas, values, sign):
+    for user_id, task_role in task_roles(values['created_by'], values['assigned_to']):
+        counter_deltas[(user_id, task_role, values['status'], values['priority'])] += sign
+        if values['due_date'] is not None and values['status'] != 'completed':
+            bucket_deltas[(user_id, task_role, values['due_date'].date())] += sign
+
+def _old_values(state):
+    values = {}
+    for key in TRACKED_FIELDS:
+        history = state.attrs[key].history
+        if history.deleted:
+            values[key] = history.deleted[0]
+        elif history.unchanged:
+            values[key] = history.unchanged[0]
+        else:
+            values[key] = state.attrs[key].value
+    return values
+
+def _new_values(task):
+    return {key: getattr(task, key) for key in TRACKED_FIELDS}
+
+def upsert_increments(connection, table, rows, column='count'):
+    if not rows:
+        return
+    keys = [c.name for c in table.primary_key.columns]
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        statement = dialect_insert(table).values(rows)
+        changes = {name: statement.excluded[name] for name in rows[0] if name not in keys}
+        changes[column] = table.c[column] + statement.excluded[column]
+        connection.execute(statement.on_conflict_do_update(index_elements=keys, set_=changes))
+        return
+
+    for row in rows:
+        changes = {name: value for name, value in row.items() if name not in keys}
+        changes[column] = table.c[column] + row[column]
+        result = connection.execute(
+            update(table).where(*[table.c[key] == row[key] for key in keys]).values(**changes))
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(**row))
+
+def apply_deltas(connection, counter_deltas, bucket_deltas):
+    upsert_increments(connection, TaskCounter.__table__, [
+        {'user_id': user_id, 'task_role': task_role, 'status': status, 'priority': priority, 'count': delta}
+        for (user_id, task_role, status, priority), delta in sorted(counter_deltas.items()) if delta
+    ])
+    upsert_increments(connection, TaskDueBucket.__table__, [
+        {'user_id': user_id, 'task_role': task_role, 'due_day': due_day, 'count': delta}
+        for (user_id, task_role, due_day), delta in sorted(bucket_deltas.items()) if delta
+    ])
+
+def update_task_counters(session, flush_context):
+    counter_deltas = defaultdict(int)
+    bucket_deltas = defaultdict(int)
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            add_task_deltas(counter_deltas, bucket_deltas, _new_values(obj), 1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            state = inspect(obj)
+            if not any(state.attrs[key].history.has_changes() for key in TRACKED_FIELDS):
+                continue
+            add_task_deltas(counter_deltas, bucket_deltas, _old_values(state), -1)
+            add_task_deltas(counter_deltas, bucket_deltas, _new_values(obj), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            add_task_deltas(counter_deltas, bucket_deltas, _old_values(inspect(obj)), -1)
+
+    if counter_deltas or bucket_deltas:
+        with unbudgeted():
+            apply_deltas(session.connection(), counter_deltas, bucket_deltas)
+
+def init_counters(app):
+    if not event.contains(Session, 'after_flush', update_task_counters):
+        event.listen(Session, 'after_flush', update_task_counters)
+
+def _counter_scope(query, model, user):
+    if user is None or user.is_admin():
+        return query.filter(model.task_role.in_(OWNER_ROLES))
+    return query.filter(model.user_id == user.id)
+
+def _sum_when(condition):
+    return func.coalesce(func.sum(case((condition, TaskCounter.count), else_=0)), 0)
+
+def past_due_query(user, today):
+    query = db.session.query(func.coalesce(func.sum(TaskDueBucket.count), 0)).filter(TaskDueBucket.due_day < today)
+    return _counter_scope(query, TaskDueBucket, user)
+
+def overdue_today_query(user, now):
+    query = db.session.query(func.count(Task.id)).filter(
+        Task.due_date >= datetime.combine(now.date(), time.min),
+        overdue_condition(now)
+    )
+    scope = user_scope(user)
+    if scope is not None:
+        query = query.filter(scope)
+    return query
+
+def counter_overdue(user=None, now=None):
+    now = now or datetime.utcnow()
+    return past_due_query(user, now.date()).scalar() + overdue_today_query(user, now).scalar()
+
+def counter_totals_query(user=None):
+    query = db.session.query(
+        func.coalesce(func.sum(TaskCounter.count), 0),
+        _sum_when(TaskCounter.status == 'completed'),
+        _sum_when(TaskCounter.status == 'pending'),
+        _sum_when(TaskCounter.status == 'in_progress'),
+        _sum_when(TaskCounter.priority == 'high'),
+        _sum_when(TaskCounter.priority == 'medium'),
+        _sum_when(TaskCounter.priority == 'low'),
+    )
+    return _counter_scope(query, TaskCounter, user)
+
+def counter_totals(user=None, now=None):
+    total, completed, pending, in_progress, high, medium, low = counter_totals_query(user).one()
+    return {
+        'total': total,
+        'completed': completed,
+        'pending': pending,
+        'in_progress': in_progress,
+        'overdue': counter_overdue(user, now),
+        'priority': {'high': high, 'medium': medium, 'low': low}
+    }
+
+def counter_count_query(user=None, status=None, priority=None):
+    query = db.session.query(func.coalesce(func.sum(TaskCounter.count), 0))
+    if status:
+        query = query.filter(TaskCounter.status == status)
+    if priority:
+        query = query.filter(TaskCounter.priority == priority)
+    return _counter_scope(query, TaskCounter, user)
+
+def counter_count(user=None, status=None, priority=None):
+    return counter_count_query(user, status, priority).scalar()
+
+def counter_assignee_stats():
+    rows = db.session.query(
+        User.username,
+        func.coalesce(func.sum(TaskCounter.count), 0),
+        _sum_when(TaskCounter.status == 'completed'),
+    ).outerjoin(TaskCounter, (TaskCounter.user_id == User.id) & TaskCounter.task_role.in_(ASSIGNEE_ROLES)) \
+        .group_by(User.id, User.username).order_by(User.id).all()
+
+    return [{
+        'username': username,
+        'total_tasks': total,
+        'completed_tasks': completed,
+        'completion_rate': round((completed / total * 100), 2) if total > 0 else 0
+    } for username, total, completed in rows]
+
+def _recount():
+    counter_deltas = defaultdict(int)
+    bucket_deltas = defaultdict(int)
+    rows = db.session.query(*[getattr(Task, key) for key in TRACKED_FIELDS]).yield_per(1000)
+    for row in rows:
+        add_task_deltas(counter_deltas, bucket_deltas, dict(zip(TRACKED_FIELDS, row)), 1)
+    return counter_deltas, bucket_deltas
+
+def rebuild_counters():
+    counter_deltas, bucket_deltas = _recount()
+    connection = db.session.connection()
+    connection.execute(delete(TaskCounter.__table__))
+    connection.execute(delete(TaskDueBucket.__table__))
+    apply_deltas(connection, counter_deltas, bucket_deltas)
+    db.session.commit()
+    return len(counter_deltas), len(bucket_deltas)
+
+def check_counters():
+    expected_counters, expected_buckets = _recount()
+    stored_counters = {(c.user_id, c.task_role, c.status, c.priority): c.count for c in TaskCounter.query.all()}
+    stored_buckets = {(b.user_id, b.task_role, b.due_day): b.count for b in TaskDueBucket.query.all()}
+
+    mismatches = []
+    for name, expected, stored in (('counter', expected_counters, stored_counters), ('due_bucket', expected_buckets, stored_buckets)):
+        for key in set(expected) | set(stored):
+            if expected.get(key, 0) != stored.get(key, 0):
+                mismatches.append((name, key, expected.get(key, 0), stored.get(key, 0)))
+    return mismatches
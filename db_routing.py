@@ -0,0 +1,122 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from flask import current_app, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event, Select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool, NullPool
+from metrics import DB_POOL_WAIT
+
+REPLICA_PREFIX = 'replica_'
+_replica_reads = ContextVar('replica_reads', default=False)
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start, self.logging_name or 'primary')
+
+class RoutingSession(FlaskSession):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and _replica_reads.get() and not self._flushing and not self.info.get('wrote')
+                and isinstance(clause, Select) and clause._for_update_arg is None):
+            replica = self.info.get('replica')
+            if replica is None:
+                replicas = [key for key in self._db.engines if key and key.startswith(REPLICA_PREFIX)]
+                if replicas:
+                    replica = self.info['replica'] = random.choice(replicas)
+            if replica is not None:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def close(self):
+        self.info.pop('replica', None)
+        super().close()
+
+def engine_options(config, url, name):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+
+    options = {'pool_logging_name': name}
+    if config['DB_PGBOUNCER']:
+        options['poolclass'] = NullPool
+    else:
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+            pool_pre_ping=config['DB_POOL_PRE_PING'],
+        )
+    timeout = config['DB_STATEMENT_TIMEOUT_MS']
+    if backend == 'postgresql' and timeout and not config['DB_PGBOUNCER']:
+        options['connect_args'] = {'options': f'-c statement_timeout={timeout}'}
+    return options
+
+def configure_engines(app):
+    config = app.config
+    if not config['SQLALCHEMY_DATABASE_URI']:
+        return
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config, config['SQLALCHEMY_DATABASE_URI'], 'primary')
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+    for i, url in enumerate(config['DATABASE_REPLICA_URLS']):
+        binds[f'{REPLICA_PREFIX}{i}'] = {'url': url, **engine_options(config, url, f'{REPLICA_PREFIX}{i}')}
+    config['SQLALCHEMY_BINDS'] = binds
+
+def init_db_routing(app):
+    from extensions import db
+    timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+    if not (app.config['DB_PGBOUNCER'] and timeout):
+        return
+
+    def set_statement_timeout(connection):
+        if connection.dialect.name == 'postgresql':
+            connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'begin', set_statement_timeout)
+
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+def read_replica(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with replica_reads(flask_session.get('primary_until', 0) < time.time()):
+            return f(*args, **kwargs)
+    return decorated_function
+
+@event.listens_for(Session, 'do_orm_execute')
+def mark_write_statement(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+@event.listens_for(Session, 'after_flush')
+def mark_flush(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(Session, 'after_commit')
+def stick_to_primary(session):
+    session.info.pop('replica', None)
+    if session.info.pop('wrote', False) and has_request_context() and current_app.config['DATABASE_REPLICA_URLS']:
+        flask_session['primary_until'] = time.time() + current_app.config['READ_AFTER_WRITE_SECONDS']
+
+@event.listens_for(Session, 'after_rollback')
+def clear_write_mark(session):
+    session.info.pop('wrote', None)
+    session.info.pop('replica', None)
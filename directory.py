@@ -0,0 +1,60 @@
+from bisect import bisect_left
+from threading import Lock
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from extensions import db
+from models import User
+from versions import cache_version, bump_cache_version
+from query_budget import unbudgeted
+
+USER_VERSION_FIELDS = ('username', 'email', 'role')
+
+class UserDirectory:
+    def __init__(self, version, rows):
+        self.version = version
+        self.names = dict(rows)
+        self.ids = {username: user_id for user_id, username in rows}
+        self.entries = sorted(((username.lower(), user_id, username) for user_id, username in rows))
+        self.keys = [key for key, _, _ in self.entries]
+
+    def search(self, prefix, limit):
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, prefix)
+        results = []
+        for key, user_id, username in self.entries[start:]:
+            if not key.startswith(prefix) or len(results) >= limit:
+                break
+            results.append((user_id, username))
+        return results
+
+_directory = None
+_directory_lock = Lock()
+
+@event.listens_for(Session, 'after_flush')
+def invalidate_user_directory(session, flush_context):
+    changed = any(isinstance(obj, User) for obj in session.new) or any(isinstance(obj, User) for obj in session.deleted)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            changed = changed or any(state.attrs[key].history.has_changes() for key in USER_VERSION_FIELDS)
+    if changed:
+        with unbudgeted():
+            bump_cache_version(session.connection(), 'users')
+
+def user_directory():
+    global _directory
+    version = cache_version('users')
+    directory = _directory
+    if directory is None or directory.version != version:
+        with _directory_lock:
+            if _directory is None or _directory.version != version:
+                _directory = UserDirectory(version, db.session.query(User.id, User.username).all())
+            directory = _directory
+    return directory
+
+def assignee_choices(*user_ids, directory=None):
+    names = (directory or user_directory()).names
+    return [(0, 'Unassigned')] + [(user_id, names[user_id]) for user_id in dict.fromkeys(user_ids) if user_id in names]
+
+def search_users(prefix, limit=20):
+    return user_directory().search(prefix, limit)
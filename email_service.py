@@ -1,13 +1,16 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+from flask import current_app
 from flask_mail import Message
-from extensions import mail
-from models import Task, User
+from sqlalchemy import insert
+from extensions import db, mail
+from models import Task, User, OutboxEmail
+from metrics import EMAIL_SEND_DURATION
 
-def send_task_assignment_email(user, task):
-    try:
-        msg = Message(
-            subject=f'New Task Assigned: {task.title}',
-            recipients=[user.email],
-            body=f'''Hello {user.username},
+def task_assignment_message(user, task):
+    subject = f'New Task Assigned: {task.title}'
+    body = f'''Hello {user.username},
 
 You have been assigned a new task:
 
@@ -21,18 +24,11 @@ Please log in to the Task Management System to view and manage this task.
 Best regards,
 Task Management System
 '''
-        )
-        mail.send(msg)
-        print(f'Task assignment email sent to {user.email}')
-    except Exception as e:
-        print(f'Failed to send email: {e}')
-
-def send_due_date_reminder(user, task):
-    try:
-        msg = Message(
-            subject=f'Task Due Soon: {task.title}',
-            recipients=[user.email],
-            body=f'''Hello {user.username},
+    return subject, body
+
+def due_date_reminder_message(user, task):
+    subject = f'Task Due Soon: {task.title}'
+    body = f'''Hello {user.username},
 
 This is a reminder that your task is due soon:
 
@@ -47,8 +43,135 @@ Please log in to the Task Management System to update this task.
 Best regards,
 Task Management System
 '''
-        )
-        mail.send(msg)
-        print(f'Due date reminder sent to {user.email}')
-    except Exception as e:
-        print(f'Failed to send email: {e}')
+    return subject, body
+
+def due_date_digest_message(user, tasks):
+    subject = f'{len(tasks)} Tasks Due Soon' if len(tasks) > 1 else f'Task Due Soon: {tasks[0].title}'
+    lines = '\n'.join(
+        f"- {task.title} ({task.priority.capitalize()} priority, {task.status.replace('_', ' ')}) due {task.due_date.strftime('%Y-%m-%d %H:%M')}"
+        for task in tasks
+    )
+    body = f'''Hello {user.username},
+
+This is a reminder that the following tasks are due soon:
+
+{lines}
+
+Please log in to the Task Management System to update these tasks.
+
+Best regards,
+Task Management System
+'''
+    return subject, body
+
+def queue_email(user, kind, subject, body, task=None, dedupe_key=None):
+    dedupe_key = dedupe_key or f'{kind}:{user.id}:{task.id if task else ""}'
+    pending = OutboxEmail.query.filter_by(dedupe_key=dedupe_key, status='pending').first()
+    if pending:
+        return pending
+
+    email = OutboxEmail(
+        user_id=user.id,
+        task_id=task.id if task else None,
+        kind=kind,
+        dedupe_key=dedupe_key,
+        recipient=user.email,
+        subject=subject,
+        body=body
+    )
+    db.session.add(email)
+    return email
+
+def queue_task_assignment_email(user, task):
+    return queue_email(user, 'assignment', *task_assignment_message(user, task), task=task)
+
+def queue_task_assignment_emails(assignments):
+    rows = {}
+    for user, task in assignments:
+        subject, body = task_assignment_message(user, task)
+        dedupe_key = f'assignment:{user.id}:{task.id}'
+        rows[dedupe_key] = {
+            'user_id': user.id,
+            'task_id': task.id,
+            'kind': 'assignment',
+            'dedupe_key': dedupe_key,
+            'recipient': user.email,
+            'subject': subject,
+            'body': body
+        }
+    if not rows:
+        return 0
+
+    pending = {key for key, in db.session.query(OutboxEmail.dedupe_key).filter(
+        OutboxEmail.status == 'pending', OutboxEmail.dedupe_key.in_(list(rows)))}
+    new_rows = [row for key, row in rows.items() if key not in pending]
+    if new_rows:
+        db.session.execute(insert(OutboxEmail), new_rows)
+    return len(new_rows)
+
+def queue_due_date_reminder(user, task):
+    return queue_email(user, 'reminder', *due_date_reminder_message(user, task), task=task)
+
+def queue_due_date_digest(user, tasks):
+    task_ids = ','.join(str(task.id) for task in sorted(tasks, key=lambda task: task.id))
+    dedupe_key = f'digest:{user.id}:{hashlib.sha1(task_ids.encode()).hexdigest()}'
+    return queue_email(user, 'digest', *due_date_digest_message(user, tasks), dedupe_key=dedupe_key)
+
+def _claim_batch(batch_size, now):
+    return OutboxEmail.query.filter(
+        OutboxEmail.status == 'pending',
+        OutboxEmail.next_attempt_at <= now
+    ).order_by(OutboxEmail.next_attempt_at, OutboxEmail.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+def _record_failure(email, error, now):
+    config = current_app.config
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= config['OUTBOX_MAX_ATTEMPTS']:
+        email.status = 'failed'
+        current_app.logger.error(f'Giving up on email to {email.recipient} after {email.attempts} attempts: {error}')
+    else:
+        email.next_attempt_at = now + timedelta(seconds=config['OUTBOX_RETRY_BASE_SECONDS'] * 2 ** (email.attempts - 1))
+        current_app.logger.warning(f'Failed to send email to {email.recipient} (attempt {email.attempts}): {error}')
+
+def deliver_outbox(batch_size=None):
+    batch_size = batch_size or current_app.config['OUTBOX_BATCH_SIZE']
+    sent = failed = 0
+
+    while True:
+        now = datetime.utcnow()
+        batch = _claim_batch(batch_size, now)
+        if not batch:
+            break
+
+        handled = set()
+        try:
+            with mail.connect() as connection:
+                for email in batch:
+                    handled.add(email.id)
+                    start = time.perf_counter()
+                    try:
+                        connection.send(Message(subject=email.subject, recipients=[email.recipient], body=email.body))
+                        EMAIL_SEND_DURATION.observe(time.perf_counter() - start, 'sent')
+                        email.status = 'sent'
+                        email.sent_at = now
+                        sent += 1
+                    except Exception as e:
+                        EMAIL_SEND_DURATION.observe(time.perf_counter() - start, 'failed')
+                        _record_failure(email, e, now)
+                        failed += 1
+        except Exception as e:
+            for email in batch:
+                if email.id not in handled:
+                    _record_failure(email, e, now)
+                    failed += 1
+            db.session.commit()
+            break
+
+        db.session.commit()
+        if len(batch) < batch_size:
+            break
+
+    if sent or failed:
+        current_app.logger.info(f'Outbox delivered {sent} emails, {failed} failed')
+    return sent, failed
@@ -0,0 +1,180 @@
+import itertools
+import json
+import os
+import queue
+from threading import Lock, Thread
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from models import Task
+
+EVENT_FIELDS = ('id', 'title', 'status', 'priority', 'due_date', 'assigned_to', 'created_by')
+ADMIN_CHANNEL = 'admin'
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+def task_event(kind, values, old_assignee=None):
+    task = {key: values.get(key) for key in EVENT_FIELDS}
+    if task['due_date'] is not None:
+        task['due_date'] = task['due_date'].isoformat()
+    users = {task['created_by'], task['assigned_to'], old_assignee} - {None}
+    return {'type': kind, 'task': task, 'channels': [user_channel(user_id) for user_id in sorted(users)] + [ADMIN_CHANNEL]}
+
+def assignment_events(kind, values, old_assignee=None):
+    events = [task_event(kind, values, old_assignee)]
+    if values.get('assigned_to') and values.get('assigned_to') != old_assignee:
+        assigned = task_event('task.assigned', values)
+        assigned['channels'] = [user_channel(values['assigned_to'])]
+        events.append(assigned)
+    return events
+
+class Subscription:
+    def __init__(self, channels, size):
+        self.channels = channels
+        self.queue = queue.Queue(size)
+        self.overflowed = False
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class LocalBroker:
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self.channels = {}
+        self.lock = Lock()
+        self.ids = itertools.count(1)
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, self.queue_size)
+        with self.lock:
+            for channel in channels:
+                self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.channels.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.channels[channel]
+
+    def deliver(self, message):
+        message = dict(message, id=next(self.ids))
+        with self.lock:
+            subscribers = set()
+            for channel in message.pop('channels'):
+                subscribers.update(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def publish(self, messages):
+        for message in messages:
+            self.deliver(message)
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(set().union(*self.channels.values())) if self.channels else 0
+
+class RedisBroker(LocalBroker):
+    def __init__(self, url, channel, queue_size):
+        import redis
+        super().__init__(queue_size)
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+        self.listener_pid = None
+        self.listener_lock = Lock()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for item in pubsub.listen():
+            try:
+                self.deliver(json.loads(item['data']))
+            except ValueError:
+                continue
+
+    def subscribe(self, channels):
+        with self.listener_lock:
+            if self.listener_pid != os.getpid():
+                Thread(target=self._listen, daemon=True).start()
+                self.listener_pid = os.getpid()
+        return super().subscribe(channels)
+
+    def publish(self, messages):
+        for message in messages:
+            self.client.publish(self.channel, json.dumps(message))
+
+def init_events(app):
+    config = app.config
+    if config['EVENTS_BACKEND'] == 'redis':
+        broker = RedisBroker(config['EVENTS_REDIS_URL'], config['EVENTS_REDIS_CHANNEL'], config['EVENTS_QUEUE_SIZE'])
+    else:
+        broker = LocalBroker(config['EVENTS_QUEUE_SIZE'])
+    app.extensions['task_events'] = broker
+    return broker
+
+def subscribe(user):
+    channels = [user_channel(user.id)]
+    if user.is_admin():
+        channels.append(ADMIN_CHANNEL)
+    return current_app.extensions['task_events'].subscribe(channels)
+
+def stream_events(broker, subscription, keepalive):
+    try:
+        yield f'retry: {keepalive * 1000}\n\n'
+        while True:
+            message = subscription.get(keepalive)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield 'event: resync\ndata: {}\n\n'
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+            yield f"id: {message['id']}\nevent: {message['type']}\ndata: {json.dumps(message['task'])}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+def record_task_events(session, events):
+    session.info.setdefault('task_events', []).extend(events)
+
+@event.listens_for(Session, 'after_flush')
+def collect_task_events(session, flush_context):
+    events = []
+    for obj in session.new:
+        if isinstance(obj, Task):
+            events.extend(assignment_events('task.created', {key: getattr(obj, key) for key in EVENT_FIELDS}))
+    for obj in session.dirty:
+        if isinstance(obj, Task) and session.is_modified(obj):
+            history = inspect(obj).attrs.assigned_to.history
+            old_assignee = history.deleted[0] if history.deleted else obj.assigned_to
+            events.extend(assignment_events('task.updated', {key: getattr(obj, key) for key in EVENT_FIELDS}, old_assignee))
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            events.append(task_event('task.deleted', {key: getattr(obj, key) for key in EVENT_FIELDS}))
+    if events:
+        record_task_events(session, events)
+
+@event.listens_for(Session, 'after_commit')
+def publish_task_events(session):
+    events = session.info.pop('task_events', None)
+    if events and has_app_context() and 'task_events' in current_app.extensions:
+        try:
+            current_app.extensions['task_events'].publish(events)
+        except Exception as e:
+            current_app.logger.exception(f'Failed to publish task events: {e}')
+
+@event.listens_for(Session, 'after_rollback')
+def discard_task_events(session):
+    session.info.pop('task_events', None)
@@ -0,0 +1,218 @@
+import time
+from bisect import bisect_left
+from ipaddress import ip_address
+from threading import Lock
+from flask import g, has_request_context, request, current_app, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REGISTRY = []
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = {}
+        self.lock = Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = list(self.values.items())
+        for labels, value in values:
+            yield f'{self.name}{_labels(self.labels, labels)} {value}'
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self.values = {}
+        self.lock = Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self):
+        with self.lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self.values.items()]
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels(self.labels, labels, ("le", bound))} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labels, labels)} {total}'
+            yield f'{self.name}_count{_labels(self.labels, labels)} {cumulative}'
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Request latency by endpoint', ('endpoint', 'method', 'status'))
+REQUEST_SQL_STATEMENTS = Histogram('http_request_sql_statements', 'SQL statements per request', ('endpoint',),
+                                   buckets=(1, 2, 5, 10, 20, 50, 100, 200))
+REQUEST_SQL_DURATION = Histogram('http_request_sql_duration_seconds', 'Total SQL time per request', ('endpoint',))
+TEMPLATE_RENDER_DURATION = Histogram('template_render_duration_seconds', 'Template render time', ('template',))
+EMAIL_SEND_DURATION = Histogram('email_send_duration_seconds', 'Time to hand one email to the SMTP server', ('result',))
+SCHEDULER_JOB_DURATION = Histogram('scheduler_job_duration_seconds', 'Scheduled job run time', ('job', 'result'),
+                                   buckets=(0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+DB_POOL_WAIT = Histogram('db_pool_checkout_wait_seconds', 'Time spent waiting for a pooled database connection', ('engine',),
+                         buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0))
+SCHEDULER_JOB_SKIPPED = Counter('scheduler_job_skipped_total', 'Scheduled runs skipped because another worker held the lease', ('job',))
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_seconds' in g:
+        conn.info.setdefault('statement_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def stop_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('statement_start')
+    if starts and has_request_context() and 'sql_seconds' in g:
+        elapsed = time.perf_counter() - starts.pop()
+        g.sql_seconds += elapsed
+        if 'sql_log' in g:
+            g.sql_log.append((elapsed, statement))
+
+@event.listens_for(Engine, 'handle_error')
+def discard_statement_timer(context):
+    connection = context.connection
+    starts = connection.info.get('statement_start') if connection is not None and context.statement is not None else None
+    if starts:
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context() and 'sql_seconds' in g:
+            g.sql_seconds += elapsed
+
+def collect_cache_stats():
+    cache = current_app.extensions.get('stats_cache')
+    if cache is None:
+        return []
+    lines = [
+        '# HELP stats_cache_requests_total Analytics cache lookups by result',
+        '# TYPE stats_cache_requests_total counter',
+    ]
+    stats = cache.stats()
+    for key, metrics in stats.items():
+        for result in ('hits', 'stale_hits', 'misses'):
+            lines.append(f'stats_cache_requests_total{_labels(("key", "result"), (key, result))} {metrics[result]}')
+    lines += [
+        '# HELP stats_cache_compute_seconds_total Time spent recomputing cached analytics',
+        '# TYPE stats_cache_compute_seconds_total counter',
+    ]
+    for key, metrics in stats.items():
+        lines.append(f'stats_cache_compute_seconds_total{_labels(("key",), (key,))} {metrics["compute_seconds"]}')
+    return lines
+
+def collect_pool_stats():
+    from extensions import db
+    lines = [
+        '# HELP db_pool_connections Pooled database connections by state',
+        '# TYPE db_pool_connections gauge',
+    ]
+    for key, engine in db.engines.items():
+        pool = engine.pool
+        if not hasattr(pool, 'checkedout'):
+            continue
+        name = key or 'primary'
+        for state, value in (('size', pool.size()), ('checked_out', pool.checkedout()),
+                             ('checked_in', pool.checkedin()), ('overflow', max(pool.overflow(), 0))):
+            lines.append(f'db_pool_connections{_labels(("engine", "state"), (name, state))} {value}')
+    return lines
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.description}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        lines.extend(metric.samples())
+    lines.extend(collect_cache_stats())
+    lines.extend(collect_pool_stats())
+    return '\n'.join(lines) + '\n'
+
+def log_slow_request(app, endpoint, elapsed):
+    top = sorted(g.sql_log, key=lambda item: item[0], reverse=True)[:app.config['SLOW_REQUEST_TOP_STATEMENTS']]
+    statements = ''.join(f'\n  {seconds * 1000:.1f}ms {" ".join(statement.split())[:300]}' for seconds, statement in top)
+    app.logger.warning(
+        f'Slow request {request.method} {request.path} ({endpoint}): {elapsed * 1000:.0f}ms, '
+        f'{g.get("sql_statements", 0)} SQL statements in {g.sql_seconds * 1000:.0f}ms{statements}')
+
+def is_local_request():
+    try:
+        local = ip_address(request.remote_addr).is_loopback
+    except ValueError:
+        return False
+    return local and 'X-Forwarded-For' not in request.headers
+
+def init_metrics(app):
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        g.sql_seconds = 0.0
+        if app.config['SLOW_REQUEST_MS']:
+            g.sql_log = []
+
+    @app.after_request
+    def record_response_status(response):
+        g.response_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        start = g.pop('request_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'none'
+        status = g.get('response_status', 500)
+        REQUEST_DURATION.observe(elapsed, endpoint, request.method, str(status))
+        REQUEST_SQL_STATEMENTS.observe(g.get('sql_statements', 0), endpoint)
+        REQUEST_SQL_DURATION.observe(g.sql_seconds, endpoint)
+        if app.config['SLOW_REQUEST_MS'] and elapsed * 1000 >= app.config['SLOW_REQUEST_MS']:
+            log_slow_request(app, endpoint, elapsed)
+
+    def start_template_timer(sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault('template_starts', []).append(time.perf_counter())
+
+    def stop_template_timer(sender, template, context, **extra):
+        if has_request_context() and g.get('template_starts'):
+            TEMPLATE_RENDER_DURATION.observe(time.perf_counter() - g.template_starts.pop(), template.name or 'string')
+
+    before_render_template.connect(start_template_timer, app, weak=False)
+    template_rendered.connect(stop_template_timer, app, weak=False)
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config['METRICS_TOKEN']
+        if token:
+            if request.headers.get('Authorization') != f'Bearer {token}':
+                return 'Unauthorized', 401
+        elif not is_local_request():
+            return 'Forbidden', 403
+        return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -1,6 +1,7 @@
 from extensions import db
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy import event, func, literal, DDL
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -22,6 +23,18 @@ class User(db.Model, UserMixin):
         return f'<User {self.username}>'
 
 class Task(db.Model):
+    __table_args__ = (
+        db.Index('ix_task_assigned_to_created_at', 'assigned_to', 'created_at'),
+        db.Index('ix_task_created_by_created_at', 'created_by', 'created_at'),
+        db.Index('ix_task_status_created_at', 'status', 'created_at'),
+        db.Index('ix_task_priority_created_at', 'priority', 'created_at'),
+        db.Index('ix_task_created_at', 'created_at'),
+        db.Index('ix_task_updated_at', 'updated_at'),
+        db.Index('ix_task_open_due_date', 'due_date',
+                 postgresql_where=db.text("status != 'completed'"),
+                 sqlite_where=db.text("status != 'completed'")),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -32,6 +45,7 @@ class Task(db.Model):
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     assigned_to = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    reminder_sent_at = db.Column(db.DateTime, nullable=True)
     
     def __repr__(self):
         return f'<Task {self.title}>'
@@ -40,3 +54,141 @@ class Task(db.Model):
         if self.due_date and self.status != 'completed':
             return datetime.utcnow() > self.due_date
         return False
+
+class ArchivedTask(db.Model):
+    __tablename__ = 'archived_task'
+    __table_args__ = (
+        db.Index('ix_archived_task_assigned_to_created_at', 'assigned_to', 'created_at'),
+        db.Index('ix_archived_task_created_by_created_at', 'created_by', 'created_at'),
+        db.Index('ix_archived_task_created_at', 'created_at'),
+        db.Index('ix_archived_task_archived_at', 'archived_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    priority = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    due_date = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    assigned_to = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    assignee = db.relationship('User', foreign_keys=[assigned_to], viewonly=True)
+    
+    def __repr__(self):
+        return f'<ArchivedTask {self.title}>'
+    
+    def is_overdue(self):
+        return False
+
+class ArchiveRollup(db.Model):
+    __tablename__ = 'archive_rollup'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    task_role = db.Column(db.String(20), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ArchiveRollup {self.user_id} {self.task_role} {self.priority}: {self.count}>'
+
+@event.listens_for(Task.due_date, 'set')
+def reset_reminder(task, value, old_value, initiator):
+    if value != old_value:
+        task.reminder_sent_at = None
+
+def task_search_vector():
+    document = func.coalesce(Task.__table__.c.title, '').op('||')(' ').op('||')(func.coalesce(Task.__table__.c.description, ''))
+    return func.to_tsvector(literal('english', literal_execute=True), document)
+
+db.Index('ix_task_search_vector', task_search_vector(), postgresql_using='gin').ddl_if(dialect='postgresql')
+
+TASK_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5(title, description, content='task', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_insert AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_delete AFTER DELETE ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_update AFTER UPDATE OF title, description ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO task_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+for statement in TASK_FTS_DDL:
+    event.listen(Task.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+class SchedulerLease(db.Model):
+    __tablename__ = 'scheduler_lease'
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    high_water_mark = db.Column(db.DateTime, nullable=True)
+    last_success_at = db.Column(db.DateTime, nullable=True)
+    last_started_at = db.Column(db.DateTime, nullable=True)
+    last_duration_ms = db.Column(db.Integer, nullable=True)
+    last_lag_seconds = db.Column(db.Integer, nullable=True)
+    last_interval_seconds = db.Column(db.Integer, nullable=True)
+    next_due_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    runs = db.Column(db.Integer, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} held by {self.owner} until {self.expires_at}>'
+
+class OutboxEmail(db.Model):
+    __tablename__ = 'outbox_email'
+    __table_args__ = (
+        db.Index('ix_outbox_email_pending', 'status', 'next_attempt_at'),
+        db.Index('ix_outbox_email_dedupe_key', 'dedupe_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    task_id = db.Column(db.Integer, nullable=True)
+    kind = db.Column(db.String(20), nullable=False)
+    dedupe_key = db.Column(db.String(100), nullable=False)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<OutboxEmail {self.kind} to {self.recipient}: {self.status}>'
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_version'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<CacheVersion {self.name}: {self.version}>'
+
+class TaskCounter(db.Model):
+    __tablename__ = 'task_counter'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    task_role = db.Column(db.String(20), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<TaskCounter {self.user_id} {self.task_role} {self.status} {self.priority}: {self.count}>'
+
+class TaskDueBucket(db.Model):
+    __tablename__ = 'task_due_bucket'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    task_role = db.Column(db.String(20), primary_key=True)
+    due_day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<TaskDueBucket {self.user_id} {self.task_role} {self.due_day}: {self.count}>'
@@ -0,0 +1,65 @@
+import base64
+import binascii
+from datetime import datetime
+from math import ceil
+from sqlalchemy import or_, and_
+from models import Task
+
+def encode_cursor(task):
+    raw = f'{task.created_at.isoformat()},{task.id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, task_id = raw.rsplit(',', 1)
+        return datetime.fromisoformat(created_at), int(task_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+def newest_first(query, model=Task):
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+def _after(query, position, model=Task):
+    created_at, task_id = position
+    return query.filter(or_(
+        model.created_at < created_at,
+        and_(model.created_at == created_at, model.id < task_id)
+    ))
+
+class KeysetPage:
+    def __init__(self, items, per_page, next_cursor, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return ceil(self.total / self.per_page)
+
+def keyset_query(query, after=None, per_page=10, model=Task):
+    position = decode_cursor(after) if after else None
+    if position:
+        query = _after(query, position, model)
+    return newest_first(query, model).limit(per_page + 1)
+
+def keyset_paginate(query, after=None, per_page=10, total=None):
+    items = keyset_query(query, after, per_page).all()
+    next_cursor = encode_cursor(items[per_page - 1]) if len(items) > per_page else None
+    return KeysetPage(items[:per_page], per_page, next_cursor, total)
+
+def merged_keyset_paginate(queries, after=None, per_page=10):
+    items = []
+    for query, model in queries:
+        items.extend(keyset_query(query, after, per_page, model).all())
+
+    items.sort(key=lambda item: (item.created_at, item.id), reverse=True)
+    next_cursor = encode_cursor(items[per_page - 1]) if len(items) > per_page else None
+    return KeysetPage(items[:per_page], per_page, next_cursor)
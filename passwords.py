@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from threading import BoundedSemaphore, Lock
+import bcrypt as bcrypt_backend
+from flask import current_app
+from werkzeug.exceptions import TooManyRequests
+
+class PasswordHasherBusy(TooManyRequests):
+    description = 'Too many sign-in requests are being processed. Please try again in a moment.'
+
+def _hash(password, rounds):
+    return bcrypt_backend.hashpw(password.encode('utf-8'), bcrypt_backend.gensalt(rounds)).decode('utf-8')
+
+def _check(hashed, password):
+    return bcrypt_backend.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+def _start_context():
+    # Forking a threaded server can copy held locks into the workers.
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+class PasswordHasher:
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self.slots = BoundedSemaphore(max_pending)
+        self.lock = Lock()
+        self.pool = None
+        self.pool_pid = None
+
+    def _executor(self):
+        with self.lock:
+            if self.pool is None or self.pool_pid != os.getpid():
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_start_context())
+                self.pool_pid = os.getpid()
+            return self.pool
+
+    def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        if self.workers == 0:
+            try:
+                return func(*args)
+            finally:
+                self.slots.release()
+        try:
+            future = self._executor().submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda future: self.slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy()
+
+def init_password_hasher(app):
+    config = app.config
+    hasher = PasswordHasher(config['PASSWORD_HASH_WORKERS'], config['PASSWORD_HASH_MAX_PENDING'], config['PASSWORD_HASH_TIMEOUT'])
+    app.extensions['password_hasher'] = hasher
+    return hasher
+
+def _hasher():
+    return current_app.extensions['password_hasher']
+
+def hash_password(password):
+    return _hasher().run(_hash, password, current_app.config['BCRYPT_LOG_ROUNDS'])
+
+def check_password(hashed, password):
+    return _hasher().run(_check, hashed, password)
+
+def hash_cost(hashed):
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed):
+    return hash_cost(hashed) != current_app.config['BCRYPT_LOG_ROUNDS']
@@ -0,0 +1,132 @@
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+from models import User
+from versions import cache_version
+
+PRINCIPAL_FIELDS = ('id', 'username', 'email', 'role')
+
+class Principal:
+    __slots__ = PRINCIPAL_FIELDS
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, email, role):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+
+    def get_id(self):
+        return str(self.id)
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def is_manager(self):
+        return self.role in ['admin', 'manager']
+
+    def as_tuple(self):
+        return tuple(getattr(self, field) for field in PRINCIPAL_FIELDS)
+
+    def __repr__(self):
+        return f'<Principal {self.username}>'
+
+class LocalPrincipalCache:
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, user_id, version):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, entry_version, principal = entry
+            if expires_at < time.monotonic() or entry_version != version:
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return principal
+
+    def set(self, principal, version):
+        with self.lock:
+            self.entries[principal.id] = (time.monotonic() + self.ttl, version, principal)
+            self.entries.move_to_end(principal.id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+class RedisPrincipalCache:
+    def __init__(self, url, ttl):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def _key(self, user_id):
+        return f'principal:{user_id}'
+
+    def get(self, user_id, version):
+        value = self.client.get(self._key(user_id))
+        if not value:
+            return None
+        entry_version, *fields = json.loads(value)
+        return Principal(*fields) if entry_version == version else None
+
+    def set(self, principal, version):
+        self.client.set(self._key(principal.id), json.dumps([version, *principal.as_tuple()]), ex=self.ttl)
+
+    def delete(self, user_id):
+        self.client.delete(self._key(user_id))
+
+def init_principal_cache(app):
+    config = app.config
+    if config['PRINCIPAL_CACHE_BACKEND'] == 'redis':
+        cache = RedisPrincipalCache(config['PRINCIPAL_CACHE_REDIS_URL'], config['PRINCIPAL_CACHE_TTL'])
+    else:
+        cache = LocalPrincipalCache(config['PRINCIPAL_CACHE_TTL'], config['PRINCIPAL_CACHE_SIZE'])
+    app.extensions['principal_cache'] = cache
+    return cache
+
+def load_principal(user_id):
+    cache = current_app.extensions['principal_cache']
+    version = cache_version('users')
+    principal = cache.get(user_id, version)
+    if principal is None:
+        row = db.session.query(*[getattr(User, field) for field in PRINCIPAL_FIELDS]).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        cache.set(principal, version)
+    return principal
+
+@event.listens_for(Session, 'after_flush')
+def collect_changed_principals(session, flush_context):
+    changed = session.info.setdefault('changed_principals', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_changed_principals(session):
+    changed = session.info.pop('changed_principals', None)
+    if changed and has_app_context() and 'principal_cache' in current_app.extensions:
+        cache = current_app.extensions['principal_cache']
+        for user_id in changed:
+            cache.delete(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_changed_principals(session):
+    session.info.pop('changed_principals', None)
@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+
+@contextmanager
+def unbudgeted():
+    if not has_request_context() or 'sql_statements' not in g:
+        yield
+        return
+    start = g.sql_statements
+    try:
+        yield
+    finally:
+        g.unbudgeted_statements = g.get('unbudgeted_statements', 0) + g.sql_statements - start
+
+def query_budget(limit):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g.query_budget = limit
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+def query_budget_enabled(app):
+    enabled = app.config['QUERY_BUDGET_ENABLED']
+    if enabled is None:
+        return app.debug or app.testing or query_budget_strict(app)
+    return enabled
+
+def query_budget_strict(app):
+    return app.testing or app.config['QUERY_BUDGET_STRICT']
+
+def init_query_budget(app):
+    @app.before_request
+    def start_query_count():
+        g.sql_statements = 0
+
+    @app.after_request
+    def check_query_budget(response):
+        limit = g.get('query_budget')
+        statements = g.sql_statements - g.get('unbudgeted_statements', 0)
+        if limit is not None and query_budget_enabled(app) and statements > limit:
+            message = (f'{request.endpoint} issued {statements} SQL statements (budget {limit}), '
+                       f'plus {g.sql_statements - statements} from flush hooks')
+            if query_budget_strict(app):
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(f'Query budget exceeded: {message}')
+            response.headers['X-Query-Budget-Exceeded'] = f'{statements}/{limit}'
+        return response
@@ -0,0 +1,68 @@
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import text
+from extensions import db
+from models import User, ArchivedTask
+from stats import user_scope, tasks_query
+from pagination import keyset_query, encode_cursor
+from search import search_tasks
+from counters import counter_totals_query, counter_count_query, past_due_query, overdue_today_query
+from scheduler import reminder_filter, reminder_tasks_query
+from archive import archived_tasks_query, archivable_rows
+
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN ("?task"?|"?archived_task"?)\b(?! USING)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (task|archived_task)\b')
+
+def plan_queries():
+    member = User(id=1, role='user')
+    admin = User(id=1, role='admin')
+    now = datetime.utcnow()
+    after = encode_cursor(SimpleNamespace(created_at=now, id=1000))
+    lease = SimpleNamespace(high_water_mark=now, last_success_at=now)
+
+    return {
+        'dashboard_member': keyset_query(tasks_query(member)),
+        'dashboard_member_status': keyset_query(tasks_query(member, 'pending')),
+        'dashboard_member_after': keyset_query(tasks_query(member), after),
+        'dashboard_admin': keyset_query(tasks_query(admin)),
+        'dashboard_admin_status': keyset_query(tasks_query(admin, 'pending')),
+        'dashboard_admin_priority': keyset_query(tasks_query(admin, None, 'high')),
+        'dashboard_admin_after': keyset_query(tasks_query(admin), after),
+        'search_member': search_tasks(user_scope(member), 'report', {'status': 'pending'}, limit=10),
+        'counter_totals_member': counter_totals_query(member),
+        'counter_count_member': counter_count_query(member, 'pending'),
+        'past_due_member': past_due_query(member, now.date()),
+        'overdue_today_member': overdue_today_query(member, now),
+        'overdue_today_admin': overdue_today_query(admin, now),
+        'due_reminders': reminder_tasks_query(reminder_filter(now, now + timedelta(days=1))),
+        'due_reminders_incremental': reminder_tasks_query(reminder_filter(now, now + timedelta(days=1), lease, 300)),
+        'archive_selection': archivable_rows(now - timedelta(days=90), 1000),
+        'archived_member': keyset_query(archived_tasks_query(member), model=ArchivedTask),
+        'archived_admin_after': keyset_query(archived_tasks_query(admin), after, model=ArchivedTask),
+    }
+
+def explain(query):
+    dialect = db.session.get_bind().dialect
+    statement = getattr(query, 'statement', query)
+    compiled = statement.compile(dialect=dialect, compile_kwargs={'render_postcompile': True})
+    sql = str(compiled)
+    params = compiled.params
+    connection = db.session.connection()
+    if dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, tuple(params[name] for name in compiled.positiontup))
+        return [row[-1] for row in rows]
+    connection.execute(text('SET LOCAL enable_seqscan = off'))
+    rows = connection.exec_driver_sql('EXPLAIN ' + sql, params)
+    return [row[0] for row in rows]
+
+def check_query_plans():
+    full_scan = SQLITE_FULL_SCAN if db.session.get_bind().dialect.name == 'sqlite' else POSTGRES_FULL_SCAN
+    results = {}
+    try:
+        for name, query in plan_queries().items():
+            plan = explain(query)
+            results[name] = (plan, any(full_scan.search(line) for line in plan))
+    finally:
+        db.session.rollback()
+    return results
@@ -1,11 +1,29 @@
-from flask import render_template, redirect, url_for, flash, request, current_app
+from flask import render_template, redirect, url_for, flash, request, current_app, jsonify, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
-from extensions import db, bcrypt
-from models import User, Task
+from extensions import db
+from models import User, Task, ArchivedTask
 from forms import RegistrationForm, LoginForm, TaskForm
 from utils import admin_required, manager_required
+from stats import dashboard_stats, analytics_stats, estimated_task_count, user_scope, tasks_query
+from search import search_tasks
+from pagination import keyset_paginate, merged_keyset_paginate, newest_first
+from query_budget import query_budget
+from directory import assignee_choices, search_users
+from passwords import hash_password, check_password, needs_rehash
+from events import subscribe, stream_events
+from stats_cache import cached, data_version
+from db_routing import read_replica
+from bulk import detect_format, import_tasks, export_tasks, bulk_changes, parse_task_ids, apply_bulk_action, BULK_ACTIONS
 from datetime import datetime
-from sqlalchemy import or_, func
+from markupsafe import Markup
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+def with_assignee_name():
+    return joinedload(Task.assignee).load_only(User.id, User.username)
+
+def submitted_assignee(form):
+    return form.assigned_to.data if isinstance(form.assigned_to.data, int) else None
 
 def register_routes(app):
     @app.route('/')
@@ -21,7 +39,7 @@ def register_routes(app):
         
         form = RegistrationForm()
         if form.validate_on_submit():
-            hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+            hashed_password = hash_password(form.password.data)
             user = User(username=form.username.data, email=form.email.data, password=hashed_password)
             db.session.add(user)
             db.session.commit()
@@ -37,7 +55,10 @@ def register_routes(app):
         form = LoginForm()
         if form.validate_on_submit():
             user = User.query.filter_by(email=form.email.data).first()
-            if user and bcrypt.check_password_hash(user.password, form.password.data):
+            if user and check_password(user.password, form.password.data):
+                if needs_rehash(user.password):
+                    user.password = hash_password(form.password.data)
+                    db.session.commit()
                 login_user(user)
                 next_page = request.args.get('next')
                 flash(f'Welcome back, {user.username}!', 'success')
@@ -55,61 +76,48 @@ def register_routes(app):
 
     @app.route('/dashboard')
     @login_required
+    @read_replica
+    @query_budget(8)
     def dashboard():
         page = request.args.get('page', 1, type=int)
         search = request.args.get('search', '', type=str)
         status_filter = request.args.get('status', '', type=str)
         priority_filter = request.args.get('priority', '', type=str)
-        
-        query = Task.query
-        
-        if not current_user.is_admin():
-            query = query.filter(or_(Task.assigned_to == current_user.id, Task.created_by == current_user.id))
+        after = request.args.get('after', '', type=str)
+        include_archived = request.args.get('archived', '', type=str) == '1'
+        per_page = 10
         
         if search:
-            query = query.filter(or_(Task.title.ilike(f'%{search}%'), Task.description.ilike(f'%{search}%')))
-        
-        if status_filter:
-            query = query.filter_by(status=status_filter)
-        
-        if priority_filter:
-            query = query.filter_by(priority=priority_filter)
-        
-        tasks = query.order_by(Task.created_at.desc()).paginate(page=page, per_page=10, error_out=False)
-        
-        total_tasks = Task.query.filter(or_(Task.assigned_to == current_user.id, Task.created_by == current_user.id)).count() if not current_user.is_admin() else Task.query.count()
-        completed_tasks = Task.query.filter_by(status='completed')
-        if not current_user.is_admin():
-            completed_tasks = completed_tasks.filter(or_(Task.assigned_to == current_user.id, Task.created_by == current_user.id))
-        completed_tasks = completed_tasks.count()
-        
-        pending_tasks = Task.query.filter_by(status='pending')
-        if not current_user.is_admin():
-            pending_tasks = pending_tasks.filter(or_(Task.assigned_to == current_user.id, Task.created_by == current_user.id))
-        pending_tasks = pending_tasks.count()
-        
-        overdue_tasks = 0
-        for task in Task.query.all():
-            if not current_user.is_admin() and task.assigned_to != current_user.id and task.created_by != current_user.id:
-                continue
-            if task.is_overdue():
-                overdue_tasks += 1
+            filters = {'status': status_filter, 'priority': priority_filter}
+            tasks = search_tasks(user_scope(current_user), search, filters).options(with_assignee_name()).paginate(page=page, per_page=per_page, error_out=False)
+        else:
+            query = tasks_query(current_user, status_filter, priority_filter).options(with_assignee_name())
+            
+            if include_archived:
+                from archive import archived_tasks_query
+                archived_query = archived_tasks_query(current_user, status_filter, priority_filter)
+                tasks = merged_keyset_paginate([(query, Task), (archived_query, ArchivedTask)], after, per_page=per_page)
+            else:
+                total = estimated_task_count(current_user, status_filter, priority_filter)
+                if total is None and not after and current_app.config['DASHBOARD_EXACT_COUNT']:
+                    total = query.count()
+                
+                if after or total is None or total > per_page * current_app.config['DASHBOARD_PAGE_LINKS_MAX']:
+                    tasks = keyset_paginate(query, after, per_page=per_page, total=total)
+                else:
+                    tasks = newest_first(query).paginate(page=page, per_page=per_page, error_out=False, count=False)
+                    tasks.total = total
         
-        stats = {
-            'total': total_tasks,
-            'completed': completed_tasks,
-            'pending': pending_tasks,
-            'overdue': overdue_tasks
-        }
+        stats = dashboard_stats(current_user, include_archived)
         
-        return render_template('dashboard.html', tasks=tasks, stats=stats, search=search, status_filter=status_filter, priority_filter=priority_filter)
+        return render_template('dashboard.html', tasks=tasks, stats=stats, search=search, status_filter=status_filter, priority_filter=priority_filter, after=after, include_archived=include_archived)
 
     @app.route('/task/new', methods=['GET', 'POST'])
     @login_required
+    @query_budget(12)
     def new_task():
         form = TaskForm()
-        users = User.query.all()
-        form.assigned_to.choices = [(0, 'Unassigned')] + [(u.id, u.username) for u in users]
+        form.assigned_to.choices = assignee_choices(current_user.id, submitted_assignee(form))
         
         if form.validate_on_submit():
             assigned_user_id = form.assigned_to.data if form.assigned_to.data != 0 else None
@@ -129,12 +137,13 @@ def register_routes(app):
                 assigned_to=assigned_user_id
             )
             db.session.add(task)
-            db.session.commit()
+            db.session.flush()
             
             if task.assigned_to:
-                from email_service import send_task_assignment_email
-                assignee = User.query.get(task.assigned_to)
-                send_task_assignment_email(assignee, task)
+                from email_service import queue_task_assignment_email
+                queue_task_assignment_email(task.assignee, task)
+            
+            db.session.commit()
             
             flash('Task created successfully!', 'success')
             return redirect(url_for('dashboard'))
@@ -143,6 +152,7 @@ def register_routes(app):
 
     @app.route('/task/<int:task_id>/edit', methods=['GET', 'POST'])
     @login_required
+    @query_budget(16)
     def edit_task(task_id):
         task = Task.query.get_or_404(task_id)
         
@@ -151,8 +161,7 @@ def register_routes(app):
             return redirect(url_for('dashboard'))
         
         form = TaskForm()
-        users = User.query.all()
-        form.assigned_to.choices = [(0, 'Unassigned')] + [(u.id, u.username) for u in users]
+        form.assigned_to.choices = assignee_choices(current_user.id, task.assigned_to, submitted_assignee(form))
         
         if form.validate_on_submit():
             old_assignee = task.assigned_to
@@ -169,12 +178,12 @@ def register_routes(app):
             task.status = form.status.data
             task.due_date = form.due_date.data
             task.assigned_to = new_assignee
-            db.session.commit()
             
             if task.assigned_to and task.assigned_to != old_assignee:
-                from email_service import send_task_assignment_email
-                assignee = User.query.get(task.assigned_to)
-                send_task_assignment_email(assignee, task)
+                from email_service import queue_task_assignment_email
+                queue_task_assignment_email(User.query.get(task.assigned_to), task)
+            
+            db.session.commit()
             
             flash('Task updated successfully!', 'success')
             return redirect(url_for('dashboard'))
@@ -188,8 +197,17 @@ def register_routes(app):
         
         return render_template('task_form.html', form=form, action='Edit', task=task)
 
+    @app.route('/users/lookup')
+    @login_required
+    @read_replica
+    def user_lookup():
+        q = request.args.get('q', '', type=str).strip()
+        limit = min(request.args.get('limit', 20, type=int), 50)
+        return jsonify([{'id': user_id, 'username': username} for user_id, username in search_users(q, limit)])
+
     @app.route('/task/<int:task_id>/delete', methods=['POST'])
     @login_required
+    @query_budget(10)
     def delete_task(task_id):
         task = Task.query.get_or_404(task_id)
         
@@ -202,56 +220,107 @@ def register_routes(app):
         flash('Task deleted successfully!', 'success')
         return redirect(url_for('dashboard'))
 
-    @app.route('/analytics')
+    @app.route('/events')
     @login_required
-    @manager_required
-    def analytics():
-        total_tasks = Task.query.count()
-        completed_tasks = Task.query.filter_by(status='completed').count()
-        pending_tasks = Task.query.filter_by(status='pending').count()
-        in_progress_tasks = Task.query.filter_by(status='in_progress').count()
+    def events():
+        if not current_app.config['EVENTS_ENABLED']:
+            return '', 204
+        broker = current_app.extensions['task_events']
+        subscription = subscribe(current_user)
+        return Response(
+            stream_events(broker, subscription, current_app.config['EVENTS_KEEPALIVE_SECONDS']),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    @app.route('/tasks/bulk', methods=['POST'])
+    @login_required
+    def bulk_tasks():
+        data = request.get_json(silent=True)
+        from_dashboard = data is None
+        if from_dashboard:
+            data = request.form.to_dict()
+            data['task_ids'] = request.form.getlist('task_ids')
+        elif not isinstance(data, dict):
+            return jsonify({'errors': {'request': ['Expected a JSON object.']}}), 400
+        
+        action = data.get('action')
+        task_ids = parse_task_ids(data.get('task_ids', []), from_form=from_dashboard)
+        changes, errors = bulk_changes(data, current_user)
         
-        overdue_count = 0
-        for task in Task.query.all():
-            if task.is_overdue():
-                overdue_count += 1
+        if action not in BULK_ACTIONS:
+            errors['action'] = ['Not a valid choice.']
+        elif action == 'update' and not changes and not errors:
+            errors['action'] = ['Choose a status, priority or assignee to apply.']
+        if task_ids is None:
+            errors['task_ids'] = ['Must be a list of task ids.']
+        elif not task_ids:
+            errors['task_ids'] = ['Select at least one task.']
+        elif len(task_ids) > current_app.config['BULK_ACTION_MAX_TASKS']:
+            errors['task_ids'] = [f"At most {current_app.config['BULK_ACTION_MAX_TASKS']} tasks can be changed at once."]
         
-        completion_rate = round((completed_tasks / total_tasks * 100), 2) if total_tasks > 0 else 0
+        if errors:
+            if from_dashboard:
+                flash(' '.join(message for messages in errors.values() for message in messages), 'danger')
+                return redirect(url_for('dashboard'))
+            return jsonify({'errors': errors}), 400
         
-        priority_stats = {
-            'high': Task.query.filter_by(priority='high').count(),
-            'medium': Task.query.filter_by(priority='medium').count(),
-            'low': Task.query.filter_by(priority='low').count()
-        }
+        result = apply_bulk_action(current_user, task_ids, action, changes)
+        
+        if from_dashboard:
+            verb = 'deleted' if action == 'delete' else 'updated'
+            flash(f"{result['succeeded']} tasks {verb}." + (f" {result['failed']} could not be changed." if result['failed'] else ''),
+                  'success' if not result['failed'] else 'warning')
+            return redirect(url_for('dashboard'))
+        return jsonify(result), 200 if not result['failed'] else 207
+
+    @app.route('/tasks/import', methods=['POST'])
+    @login_required
+    def import_tasks_view():
+        upload = request.files.get('file')
+        if upload:
+            stream, fmt = upload.stream, detect_format(request.args.get('format'), upload.filename, upload.mimetype)
+        else:
+            stream, fmt = request.stream, detect_format(request.args.get('format'), None, request.mimetype)
         
-        user_stats = []
-        users = User.query.all()
-        for user in users:
-            user_tasks = Task.query.filter_by(assigned_to=user.id).count()
-            user_completed = Task.query.filter_by(assigned_to=user.id, status='completed').count()
-            user_stats.append({
-                'username': user.username,
-                'total_tasks': user_tasks,
-                'completed_tasks': user_completed,
-                'completion_rate': round((user_completed / user_tasks * 100), 2) if user_tasks > 0 else 0
-            })
+        result = import_tasks(stream, fmt, current_user)
         
-        stats = {
-            'total': total_tasks,
-            'completed': completed_tasks,
-            'pending': pending_tasks,
-            'in_progress': in_progress_tasks,
-            'overdue': overdue_count,
-            'completion_rate': completion_rate,
-            'priority': priority_stats,
-            'users': user_stats
-        }
+        if request.form.get('source') == 'dashboard':
+            flash(f"Imported {result['created']} tasks." + (f" {result['failed']} rows had errors." if result['failed'] else ''),
+                  'success' if not result['failed'] else 'warning')
+            return redirect(url_for('dashboard'))
+        return jsonify(result), 200 if not result['failed'] else 207
+
+    @app.route('/tasks/export')
+    @login_required
+    def export_tasks_view():
+        fmt = 'ndjson' if request.args.get('format') == 'ndjson' else 'csv'
+        status_filter = request.args.get('status', '', type=str)
+        priority_filter = request.args.get('priority', '', type=str)
+        mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/csv'
+        return Response(
+            stream_with_context(export_tasks(current_user, fmt, status_filter, priority_filter)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=tasks.{fmt}'}
+        )
+
+    @app.route('/analytics')
+    @login_required
+    @read_replica
+    @manager_required
+    @query_budget(8)
+    def analytics():
+        version = data_version()
+        stats_html = cached('analytics:html', lambda: render_template(
+            'analytics_stats.html', stats=cached('analytics:stats', analytics_stats, version, allow_stale=False)), version)
         
-        return render_template('analytics.html', stats=stats)
+        return render_template('analytics.html', stats_html=Markup(stats_html))
 
     @app.route('/users')
     @login_required
+    @read_replica
     @admin_required
+    @query_budget(3)
     def users():
         all_users = User.query.all()
         return render_template('users.html', users=all_users)
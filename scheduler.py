@@ -1,28 +1,202 @@
+import os
+import socket
+import time
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from datetime import datetime, timedelta
+from itertools import groupby
+from sqlalchemy import func, distinct, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, load_only
 
-def check_due_tasks():
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+def reminder_filter(now, window_end, lease=None, overlap_seconds=0):
+    from models import Task
+    from stats import open_condition
+
+    due_filter = [
+        Task.due_date > now,
+        Task.due_date <= window_end,
+        open_condition(),
+        Task.assigned_to.isnot(None),
+        Task.reminder_sent_at.is_(None)
+    ]
+    if lease and lease.high_water_mark and lease.last_success_at:
+        changed_since = lease.last_success_at - timedelta(seconds=overlap_seconds)
+        due_filter.append(or_(Task.due_date > lease.high_water_mark, Task.updated_at >= changed_since))
+    return due_filter
+
+def reminder_tasks_query(due_filter):
+    from models import Task, User
+    return Task.query.options(
+        load_only(Task.title, Task.description, Task.priority, Task.status, Task.due_date, Task.assigned_to),
+        joinedload(Task.assignee).load_only(User.username, User.email)
+    ).filter(*due_filter).order_by(Task.assigned_to, Task.due_date)
+
+def check_due_tasks(dry_run=False):
     from flask import current_app
     with current_app.app_context():
-        from models import Task, User
-        from email_service import send_due_date_reminder
-        
+        from extensions import db
+        from models import Task, SchedulerLease
+        from email_service import queue_due_date_reminder, queue_due_date_digest
+
+        config = current_app.config
+        digest = config['REMINDER_GROUP_BY'] == 'assignee'
         now = datetime.utcnow()
-        tomorrow = now + timedelta(days=1)
-        
-        tasks = Task.query.filter(
-            Task.due_date.between(now, tomorrow),
-            Task.status != 'completed'
-        ).all()
-        
-        for task in tasks:
-            if task.assigned_to:
-                user = User.query.get(task.assigned_to)
-                if user:
-                    send_due_date_reminder(user, task)
+        window_end = now + timedelta(hours=config['REMINDER_WINDOW_HOURS'])
+
+        lease = db.session.get(SchedulerLease, 'reminders')
+        due_filter = reminder_filter(now, window_end, lease, config['REMINDER_OVERLAP_SECONDS'])
+
+        if dry_run:
+            users, task_count = db.session.query(func.count(distinct(Task.assigned_to)), func.count(Task.id)).filter(*due_filter).one()
+            messages = users if digest else task_count
+        else:
+            tasks = reminder_tasks_query(due_filter).yield_per(config['REMINDER_CHUNK_SIZE'])
+
+            reminded = []
+            messages = unflushed = 0
+            for assigned_to, user_tasks in groupby(tasks, key=lambda task: task.assigned_to):
+                user_tasks = list(user_tasks)
+                reminded.extend(task.id for task in user_tasks)
+                if digest:
+                    queue_due_date_digest(user_tasks[0].assignee, user_tasks)
+                    batch = 1
+                else:
+                    for task in user_tasks:
+                        queue_due_date_reminder(task.assignee, task)
+                    batch = len(user_tasks)
+                messages += batch
+                unflushed += batch
+                if unflushed >= config['REMINDER_CHUNK_SIZE']:
+                    db.session.flush()
+                    unflushed = 0
+
+            tasks_table = Task.__table__
+            chunk_size = config['REMINDER_CHUNK_SIZE']
+            for start in range(0, len(reminded), chunk_size):
+                db.session.execute(
+                    update(tasks_table)
+                    .where(tasks_table.c.id.in_(reminded[start:start + chunk_size]))
+                    .values(reminder_sent_at=now, updated_at=tasks_table.c.updated_at)
+                )
+            task_count = len(reminded)
+
+            if lease:
+                lease.high_water_mark = window_end
+                lease.last_success_at = now
+            db.session.commit()
+
+        current_app.logger.info(f'{"Would queue" if dry_run else "Queued"} {messages} reminder emails for {task_count} tasks due before {window_end:%Y-%m-%d %H:%M}')
+        return messages, task_count
+
+def deliver_emails():
+    from email_service import deliver_outbox
+    deliver_outbox()
+
+def archive_tasks():
+    from archive import archive_completed_tasks
+    archive_completed_tasks()
+
+def acquire_lease(name, seconds):
+    from extensions import db
+    from models import SchedulerLease
+
+    now = datetime.utcnow()
+    leases = SchedulerLease.__table__
+    result = db.session.execute(
+        update(leases)
+        .where(leases.c.name == name, or_(leases.c.expires_at <= now, leases.c.owner == WORKER_ID))
+        .values(owner=WORKER_ID, expires_at=now + timedelta(seconds=seconds))
+    )
+    if result.rowcount == 1:
+        db.session.commit()
+        return True
+
+    if db.session.get(SchedulerLease, name) is not None:
+        db.session.rollback()
+        return False
+    try:
+        db.session.add(SchedulerLease(name=name, owner=WORKER_ID, expires_at=now + timedelta(seconds=seconds)))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+def release_lease(name, started_at, duration_ms, error=None, interval=None):
+    from extensions import db
+    from models import SchedulerLease
+
+    lease = db.session.get(SchedulerLease, name)
+    if lease is None or lease.owner != WORKER_ID:
+        return
+    if lease.last_started_at:
+        lease.last_interval_seconds = int((started_at - lease.last_started_at).total_seconds())
+    if interval:
+        due_at = lease.next_due_at or started_at
+        lag = max(0, (started_at - due_at).total_seconds())
+        lease.last_lag_seconds = int(lag)
+        lease.next_due_at = due_at + timedelta(seconds=interval * (lag // interval + 1))
+    lease.last_started_at = started_at
+    lease.last_duration_ms = duration_ms
+    lease.runs += 1
+    if error is not None:
+        lease.failures += 1
+        lease.last_error = str(error)
+    lease.expires_at = datetime.utcnow()
+    db.session.commit()
+
+def run_exclusive(app, name, job, interval=None):
+    with app.app_context():
+        from extensions import db
+        from metrics import SCHEDULER_JOB_DURATION, SCHEDULER_JOB_SKIPPED
+        if not acquire_lease(name, app.config['SCHEDULER_LEASE_SECONDS']):
+            SCHEDULER_JOB_SKIPPED.inc(name)
+            return False
+
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        error = None
+        try:
+            job()
+        except Exception as e:
+            db.session.rollback()
+            error = e
+            app.logger.exception(f'Scheduled job {name} failed: {e}')
+        elapsed = time.perf_counter() - start
+        SCHEDULER_JOB_DURATION.observe(elapsed, name, 'failure' if error else 'success')
+        release_lease(name, started_at, int(elapsed * 1000), error, interval)
+        return True
+
+def scheduler_status():
+    from models import SchedulerLease
+    return SchedulerLease.query.order_by(SchedulerLease.name).all()
+
+def add_job(scheduler, app, name, job, seconds):
+    scheduler.add_job(func=run_exclusive, args=[app, name, job, seconds], trigger="interval",
+                      seconds=seconds, max_instances=1, coalesce=True)
+
+def add_jobs(scheduler, app):
+    add_job(scheduler, app, 'reminders', check_due_tasks, app.config['REMINDER_POLL_SECONDS'])
+    add_job(scheduler, app, 'outbox', deliver_emails, app.config['OUTBOX_POLL_SECONDS'])
+    if app.config['ARCHIVE_AFTER_DAYS'] > 0:
+        add_job(scheduler, app, 'archive', archive_tasks, app.config['ARCHIVE_POLL_SECONDS'])
 
 def init_scheduler():
+    from flask import current_app
+    app = current_app._get_current_object()
     scheduler = BackgroundScheduler()
-    scheduler.add_job(func=check_due_tasks, trigger="interval", hours=24)
+    add_jobs(scheduler, app)
+    scheduler.start()
+    app.logger.info('Task reminder scheduler initialized')
+    return scheduler
+
+def run_scheduler():
+    from flask import current_app
+    app = current_app._get_current_object()
+    scheduler = BlockingScheduler()
+    add_jobs(scheduler, app)
+    app.logger.info(f'Task reminder scheduler running as {WORKER_ID}')
     scheduler.start()
-    print('Task reminder scheduler initialized')
@@ -0,0 +1,70 @@
+import re
+from flask import current_app
+from sqlalchemy import or_, func, table, column, literal, text
+from extensions import db
+from models import Task, task_search_vector, TASK_FTS_DDL
+
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+task_fts = table('task_fts', column('rowid'), column('rank'), column('task_fts'))
+
+def search_terms(q):
+    return TERM_PATTERN.findall(q.lower())
+
+class LikeSearchBackend:
+    def apply(self, query, terms):
+        for term in terms:
+            query = query.filter(or_(Task.title.ilike(f'%{term}%'), Task.description.ilike(f'%{term}%')))
+        return query.order_by(Task.created_at.desc(), Task.id.desc())
+
+class PostgresSearchBackend:
+    def apply(self, query, terms):
+        ts_query = func.to_tsquery(literal('english', literal_execute=True), ' & '.join(f'{term}:*' for term in terms))
+        vector = task_search_vector()
+        return query.filter(vector.op('@@')(ts_query)).order_by(func.ts_rank(vector, ts_query).desc(), Task.id.desc())
+
+class SqliteSearchBackend:
+    def apply(self, query, terms):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return query.join(task_fts, task_fts.c.rowid == Task.id) \
+            .filter(task_fts.c.task_fts.op('MATCH')(match)) \
+            .order_by(task_fts.c.rank, Task.id.desc())
+
+BACKENDS = {
+    'like': LikeSearchBackend,
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+
+def get_backend():
+    name = current_app.config['SEARCH_BACKEND']
+    if name == 'auto':
+        name = db.session.get_bind().dialect.name
+    return BACKENDS.get(name, LikeSearchBackend)()
+
+def search_tasks(user_scope, q, filters=None, limit=None):
+    query = Task.query
+    if user_scope is not None:
+        query = query.filter(user_scope)
+    for key, value in (filters or {}).items():
+        if value:
+            query = query.filter(getattr(Task, key) == value)
+
+    terms = search_terms(q)
+    if not terms:
+        return query.filter(db.false())
+    query = get_backend().apply(query, terms)
+    if limit:
+        query = query.limit(limit)
+    return query
+
+def rebuild_search_index():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in TASK_FTS_DDL:
+            db.session.execute(text(statement))
+        db.session.execute(text("INSERT INTO task_fts(task_fts) VALUES ('rebuild')"))
+    elif dialect == 'postgresql':
+        index = next(index for index in Task.__table__.indexes if index.name == 'ix_task_search_vector')
+        index.create(db.session.connection(), checkfirst=True)
+    db.session.commit()
+    return dialect
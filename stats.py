@@ -0,0 +1,104 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import or_, func, case, literal
+from extensions import db
+from models import User, Task
+
+def user_scope(user):
+    if user is None or user.is_admin():
+        return None
+    return or_(Task.assigned_to == user.id, Task.created_by == user.id)
+
+def tasks_query(user, status=None, priority=None):
+    query = Task.query
+    scope = user_scope(user)
+    if scope is not None:
+        query = query.filter(scope)
+    if status:
+        query = query.filter(Task.status == status)
+    if priority:
+        query = query.filter(Task.priority == priority)
+    return query
+
+def _count_when(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def open_condition():
+    # Rendered inline so the planner can match the partial ix_task_open_due_date index
+    return Task.status != literal('completed', literal_execute=True)
+
+def overdue_condition(now=None):
+    now = now or datetime.utcnow()
+    return (Task.due_date < now) & open_condition()
+
+def task_totals(scope=None, now=None):
+    query = db.session.query(
+        func.count(Task.id),
+        _count_when(Task.status == 'completed'),
+        _count_when(Task.status == 'pending'),
+        _count_when(Task.status == 'in_progress'),
+        _count_when(overdue_condition(now)),
+        _count_when(Task.priority == 'high'),
+        _count_when(Task.priority == 'medium'),
+        _count_when(Task.priority == 'low'),
+    )
+    if scope is not None:
+        query = query.filter(scope)
+    total, completed, pending, in_progress, overdue, high, medium, low = query.one()
+    return {
+        'total': total,
+        'completed': completed,
+        'pending': pending,
+        'in_progress': in_progress,
+        'overdue': overdue,
+        'priority': {'high': high, 'medium': medium, 'low': low}
+    }
+
+def assignee_stats():
+    rows = db.session.query(
+        User.username,
+        func.count(Task.id),
+        _count_when(Task.status == 'completed'),
+    ).outerjoin(Task, Task.assigned_to == User.id).group_by(User.id, User.username).order_by(User.id).all()
+
+    return [{
+        'username': username,
+        'total_tasks': total,
+        'completed_tasks': completed,
+        'completion_rate': round((completed / total * 100), 2) if total > 0 else 0
+    } for username, total, completed in rows]
+
+def dashboard_stats(user, include_archived=False):
+    if current_app.config['TASK_COUNTERS_ENABLED']:
+        from counters import counter_totals
+        totals = counter_totals(user)
+    else:
+        totals = task_totals(user_scope(user))
+    if include_archived:
+        from archive import add_archive_totals
+        add_archive_totals(totals, user)
+    return {
+        'total': totals['total'],
+        'completed': totals['completed'],
+        'pending': totals['pending'],
+        'overdue': totals['overdue']
+    }
+
+def estimated_task_count(user, status=None, priority=None):
+    if not current_app.config['TASK_COUNTERS_ENABLED']:
+        return None
+    from counters import counter_count
+    return counter_count(user, status, priority)
+
+def analytics_stats():
+    if current_app.config['TASK_COUNTERS_ENABLED']:
+        from counters import counter_totals, counter_assignee_stats
+        stats = counter_totals()
+        stats['users'] = counter_assignee_stats()
+    else:
+        stats = task_totals()
+        stats['users'] = assignee_stats()
+    from archive import add_archive_analytics
+    add_archive_analytics(stats)
+    stats['completion_rate'] = round((stats['completed'] / stats['total'] * 100), 2) if stats['total'] > 0 else 0
+    return stats
@@ -0,0 +1,132 @@
+import json
+import time
+from collections import OrderedDict, defaultdict
+from threading import Lock, Thread
+from flask import current_app
+from versions import cache_versions
+from db_routing import replica_reads
+
+CACHE_VERSIONS = ('tasks', 'users')
+
+class LocalStatsCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, expires_in):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+class RedisStatsCache:
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def _key(self, key):
+        return f'stats:{key}'
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        return tuple(json.loads(value)) if value else None
+
+    def set(self, key, entry, expires_in):
+        self.client.set(self._key(key), json.dumps(entry), ex=expires_in)
+
+def _new_metrics():
+    return {'hits': 0, 'stale_hits': 0, 'misses': 0, 'computes': 0, 'errors': 0, 'compute_seconds': 0.0, 'last_compute_ms': None}
+
+class StatsCache:
+    def __init__(self, backend, ttl, max_stale):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.metrics = defaultdict(_new_metrics)
+        self.refreshing = set()
+        self.lock = Lock()
+
+    def _count(self, key, name, amount=1):
+        with self.lock:
+            self.metrics[key][name] += amount
+
+    def _compute(self, key, version, compute):
+        start = time.perf_counter()
+        try:
+            value = compute()
+        except Exception:
+            self._count(key, 'errors')
+            raise
+        elapsed = time.perf_counter() - start
+        self.backend.set(key, (version, value, time.time()), self.max_stale)
+        with self.lock:
+            metrics = self.metrics[key]
+            metrics['computes'] += 1
+            metrics['compute_seconds'] += elapsed
+            metrics['last_compute_ms'] = int(elapsed * 1000)
+        return value
+
+    def _refresh(self, app, key, version, compute):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def run():
+            try:
+                with app.app_context(), replica_reads():
+                    self._compute(key, version, compute)
+            except Exception as e:
+                app.logger.exception(f'Failed to refresh cached {key}: {e}')
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        Thread(target=run, daemon=True).start()
+
+    def get(self, key, version, compute, allow_stale=True):
+        entry = self.backend.get(key)
+        if entry is not None:
+            entry_version, value, created_at = entry
+            age = time.time() - created_at
+            if entry_version == version and age < self.ttl:
+                self._count(key, 'hits')
+                return value
+            if allow_stale and age < self.max_stale:
+                self._count(key, 'stale_hits')
+                self._refresh(current_app._get_current_object(), key, version, compute)
+                return value
+        self._count(key, 'misses')
+        return self._compute(key, version, compute)
+
+    def stats(self):
+        with self.lock:
+            return {key: dict(metrics) for key, metrics in self.metrics.items()}
+
+def init_stats_cache(app):
+    config = app.config
+    if config['STATS_CACHE_BACKEND'] == 'redis':
+        backend = RedisStatsCache(config['STATS_CACHE_REDIS_URL'])
+    else:
+        backend = LocalStatsCache(config['STATS_CACHE_SIZE'])
+    cache = StatsCache(backend, config['STATS_CACHE_TTL'], config['STATS_CACHE_MAX_STALE'])
+    app.extensions['stats_cache'] = cache
+    return cache
+
+def data_version():
+    return [version for version, changed_at in cache_versions(*CACHE_VERSIONS)]
+
+def cached(key, compute, version=None, allow_stale=True):
+    return current_app.extensions['stats_cache'].get(key, version or data_version(), compute, allow_stale)
+
+def cache_stats():
+    return current_app.extensions['stats_cache'].stats()
@@ -0,0 +1,55 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from query_budget import QueryBudgetExceeded, init_query_budget, query_budget
+
+
+def make_app(**config):
+    app = Flask(__name__)
+    app.config.update(QUERY_BUDGET_ENABLED=None, QUERY_BUDGET_STRICT=False)
+    app.config.update(config)
+    init_query_budget(app)
+    engine = create_engine('sqlite://')
+
+    @app.route('/over-budget')
+    @query_budget(1)
+    def over_budget():
+        with engine.connect() as connection:
+            for _ in range(3):
+                connection.execute(text('SELECT 1'))
+        return 'ok'
+
+    @app.route('/within-budget')
+    @query_budget(1)
+    def within_budget():
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+        return 'ok'
+
+    return app
+
+
+def test_over_budget_view_fails_under_testing():
+    client = make_app(TESTING=True).test_client()
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/over-budget')
+
+
+def test_over_budget_view_fails_in_strict_mode():
+    client = make_app(QUERY_BUDGET_STRICT=True).test_client()
+    assert client.get('/over-budget').status_code == 500
+
+
+def test_over_budget_view_is_flagged_in_production():
+    client = make_app(QUERY_BUDGET_ENABLED=True).test_client()
+    response = client.get('/over-budget')
+    assert response.status_code == 200
+    assert response.headers['X-Query-Budget-Exceeded'] == '3/1'
+
+
+def test_within_budget_view_passes():
+    client = make_app(TESTING=True).test_client()
+    response = client.get('/within-budget')
+    assert response.status_code == 200
+    assert 'X-Query-Budget-Exceeded' not in response.headers
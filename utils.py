@@ -1,7 +1,8 @@
 from functools import wraps
 from flask import flash, redirect, url_for
 from flask_login import current_user
-from extensions import db, bcrypt
+from extensions import db
+from passwords import hash_password
 from models import User
 
 def admin_required(f):
@@ -25,7 +26,7 @@ def manager_required(f):
 def create_default_admin():
     admin = User.query.filter_by(email='admin@taskmanager.com').first()
     if not admin:
-        hashed_password = bcrypt.generate_password_hash('admin123').decode('utf-8')
+        hashed_password = hash_password('admin123')
         admin = User(
             username='admin',
             email='admin@taskmanager.com',
@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from extensions import db
+from models import Task, CacheVersion
+from counters import upsert_increments
+from query_budget import unbudgeted
+
+def cache_version(name):
+    return db.session.query(CacheVersion.version).filter_by(name=name).scalar() or 0
+
+def cache_versions(*names):
+    rows = db.session.query(CacheVersion.name, CacheVersion.version, CacheVersion.changed_at) \
+        .filter(CacheVersion.name.in_(names)).all()
+    found = {name: (version, changed_at) for name, version, changed_at in rows}
+    return [found.get(name, (0, None)) for name in names]
+
+def bump_cache_version(connection, name):
+    upsert_increments(connection, CacheVersion.__table__, [{'name': name, 'version': 1, 'changed_at': datetime.utcnow()}], 'version')
+
+@event.listens_for(Session, 'after_flush')
+def bump_task_version(session, flush_context):
+    changed = any(isinstance(obj, Task) for obj in session.new) or any(isinstance(obj, Task) for obj in session.deleted)
+    if not changed:
+        changed = any(isinstance(obj, Task) and session.is_modified(obj) for obj in session.dirty)
+    if changed:
+        with unbudgeted():
+            bump_cache_version(session.connection(), 'tasks')